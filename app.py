@@ -1,17 +1,223 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Body, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
 import uvicorn
 import sys
 import os
 from fastapi.templating import Jinja2Templates
 from starlette.responses import RedirectResponse
-from fastapi.responses import Response
-from textSummarizer.pipeline.prediction import PredictionPipeline
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from functools import partial
+from starlette.routing import Match
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.batch_scheduler import MicroBatchScheduler
+from textSummarizer.components.inference_pool import InferencePool, ServerOverloadedError
+from textSummarizer.components.summary_cache import SummaryCache
+from textSummarizer.components.model_registry import model_registry
+from textSummarizer.components.long_document import LongDocumentSummarizer
+from textSummarizer.components.adapters import UnknownAdapterError, get_adapter_path, list_adapters
+from textSummarizer.components.metrics import CONTENT_TYPE, serving_metrics
+from textSummarizer.utils.common import length_grouped_batches
+from textSummarizer.pipeline.prediction import PredictionPipeline, init_prediction_worker, predict_batch_in_worker
+from textSummarizer.logging import logger, request_logger, trace_id
 
 
 text:str = "What is Text Summarization?"
 
 app = FastAPI()
 
+# The `Document` class is one summarization request body with optional per-item generation overrides
+# and the LoRA adapter (e.g. the tenant's) to summarize with.
+class Document(BaseModel):
+    text: str
+    length_penalty: Optional[float] = None
+    num_beams: Optional[int] = None
+    max_length: Optional[int] = None
+    adapter: Optional[str] = None
+
+    def gen_overrides(self) -> dict:
+        return self.dict(exclude={"text"}, exclude_none=True)
+
+
+config_manager = ConfigurationManager()
+prediction_config = config_manager.get_prediction_config()
+inference_pool_config = config_manager.get_inference_pool_config()
+
+# Workers load the model in their initializer, so the model lives in every worker of a process
+# pool and once per process for a thread pool.
+inference_pool = InferencePool(
+    inference_pool_config,
+    initializer=init_prediction_worker,
+    initargs=(prediction_config, inference_pool_config.threads_per_worker)
+)
+batch_scheduler = MicroBatchScheduler(
+    partial(predict_batch_in_worker, prediction_config),
+    config_manager.get_batch_scheduler_config(),
+    inference_pool
+)
+summary_cache = SummaryCache(config_manager.get_summary_cache_config(), model_id=prediction_config.model_path)
+streaming_config = config_manager.get_streaming_config()
+stream_slots = asyncio.Semaphore(streaming_config.max_concurrent_streams)
+long_document_config = config_manager.get_long_document_config()
+
+
+@app.on_event("startup")
+async def startup():
+    # Warm the workers up in the background so the server starts listening immediately and
+    # /health/ready reports when the model can take traffic.
+    if prediction_config.warmup_on_startup:
+        asyncio.ensure_future(inference_pool.warmup())
+    else:
+        inference_pool.mark_ready()
+    await batch_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await batch_scheduler.stop()
+    inference_pool.shutdown()
+
+
+def route_template(request: Request) -> str:
+    """
+    The function `route_template` finds the route a request matches, so metrics are labelled with
+    e.g. "/predict" and unknown paths do not each create a new time series.
+
+    :param request: The incoming request
+    :return: the path template of the matching route, or "unmatched".
+    """
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+def observe_request(method: str, route: str, status: int, start: float, request_trace_id: str):
+    """
+    The function `observe_request` records a finished request in the metrics and the request log.
+
+    :param method: The HTTP method
+    :param route: The route template returned by `route_template`
+    :param status: The HTTP status code
+    :param start: The `time.perf_counter()` the request arrived at
+    :param request_trace_id: The trace ID of the request
+    """
+    seconds = time.perf_counter() - start
+    serving_metrics.observe_request(route, status, seconds)
+    # Response bodies are sent from another task than the one that handled the request.
+    token = trace_id.set(request_trace_id)
+    try:
+        request_logger.info("request", extra={"fields": {
+            "method": method, "route": route, "status": status,
+            "latency_ms": round(seconds * 1000, 3),
+        }})
+    finally:
+        trace_id.reset(token)
+
+
+async def observe_when_sent(body, *args):
+    """
+    The function `observe_when_sent` passes a response body through and calls `observe_request` once
+    the last chunk was sent, so streamed responses are measured until their end rather than until
+    their headers.
+
+    :param body: The body iterator of the response
+    :param args: The arguments of `observe_request`
+    """
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        observe_request(*args)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # The trace ID is taken from the caller when it sends one, so it can follow a request across
+    # services, and is returned in the `X-Trace-ID` response header.
+    request_trace_id = request.headers.get("X-Trace-ID") or uuid.uuid4().hex
+    token = trace_id.set(request_trace_id)
+    route = route_template(request)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        observe_request(request.method, route, 500, start, request_trace_id)
+        raise
+    finally:
+        trace_id.reset(token)
+
+    response.headers["X-Trace-ID"] = request_trace_id
+    response.body_iterator = observe_when_sent(response.body_iterator, request.method, route,
+                                               response.status_code, start, request_trace_id)
+    return response
+
+
+@app.exception_handler(ServerOverloadedError)
+async def server_overloaded_handler(request: Request, exc: ServerOverloadedError):
+    return JSONResponse({"detail": str(exc)}, status_code=503,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.exception_handler(UnknownAdapterError)
+async def unknown_adapter_handler(request: Request, exc: UnknownAdapterError):
+    return JSONResponse({"detail": str(exc)}, status_code=404)
+
+
+def check_adapters(documents: List[Document]):
+    """
+    The function `check_adapters` rejects requests for adapters that cannot be served before any work
+    is queued for them.
+
+    :param documents: The documents of one request
+    """
+    for document in documents:
+        if document.adapter is not None:
+            if not prediction_config.max_loaded_adapters:
+                raise UnknownAdapterError(document.adapter)
+            get_adapter_path(prediction_config.adapter_dir, document.adapter)
+
+
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    if inference_pool.is_ready():
+        return {"status": "ready"}
+    return JSONResponse({"status": "loading"}, status_code=503, headers={"Retry-After": "5"})
+
+
+@app.get("/stats")
+async def stats():
+    return {"batching": batch_scheduler.stats(), "cache": summary_cache.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    batching = batch_scheduler.stats()
+    serving_metrics.queue_depth.set(batching["queue_depth"])
+    serving_metrics.batches_in_flight.set(batching["batches_in_flight"])
+    serving_metrics.observe_summary_cache(summary_cache.stats())
+    return Response(serving_metrics.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/adapters")
+async def adapters():
+    if not prediction_config.max_loaded_adapters:
+        return []
+    return list_adapters(prediction_config.adapter_dir)
+
+
 @app.get("/", tags=["authentication"])
 async def index():
     return RedirectResponse(url="/docs")
@@ -19,7 +225,7 @@ async def index():
 @app.get("/train")
 async def training():
     try:
-        os.system("python main.py")
+        await run_in_threadpool(os.system, "python main.py")
         return Response("Training successful !!")
 
     except Exception as e:
@@ -28,16 +234,163 @@ async def training():
 
 
 
+def model_loading_response():
+    return JSONResponse({"detail": "Model is still loading"}, status_code=503,
+                        headers={"Retry-After": "5"})
+
+
+async def summarize_documents(documents: List[Document]) -> List[str]:
+    """
+    The function `summarize_documents` summarizes many documents at once. Cached summaries are
+    returned directly; the rest are grouped by generation parameters, sorted by token length and
+    run as length-homogeneous batches so little compute is spent on padding. Every uncached document
+    counts against the admission queue, and more than `max_queue_size` of them are rejected outright.
+
+    :param documents: The documents to summarize
+    :return: the summaries, in the same order as `documents`.
+    """
+    summaries = [None] * len(documents)
+    groups = {}
+
+    for index, document in enumerate(documents):
+        gen_kwargs = {**prediction_config.gen_kwargs, **document.gen_overrides()}
+        cached = summary_cache.get(document.text, gen_kwargs)
+        if cached is not None:
+            summaries[index] = cached
+        else:
+            key = tuple(sorted(gen_kwargs.items()))
+            groups.setdefault(key, (gen_kwargs, []))[1].append(index)
+
+    if not groups:
+        return summaries
+
+    pending = sum(len(indices) for _, indices in groups.values())
+    if pending > inference_pool_config.max_queue_size:
+        raise HTTPException(status_code=413, detail=f"{pending} texts to summarize, at most "
+                                                    f"{inference_pool_config.max_queue_size} are accepted per request")
+    batch_scheduler.check_admission(pending)
+    tokenizer = model_registry.get_tokenizer(prediction_config.tokenizer_path)
+
+    async def run(indices, gen_kwargs):
+        texts = [documents[i].text for i in indices]
+        for i, summary in zip(indices, await batch_scheduler.run_formed_batch(texts, gen_kwargs)):
+            summaries[i] = summary
+            summary_cache.put(documents[i].text, gen_kwargs, summary)
+
+    batches = []
+    for gen_kwargs, indices in groups.values():
+        encodings = await run_in_threadpool(
+            tokenizer, [documents[i].text for i in indices],
+            max_length=prediction_config.max_input_length, truncation=True
+        )
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        for batch in length_grouped_batches(lengths, max_batch_size=batch_scheduler.config.max_batch_size):
+            batches.append(([indices[i] for i in batch], gen_kwargs))
+
+    # Other requests may have been admitted while the documents were tokenized.
+    batch_scheduler.check_admission(pending)
+    await asyncio.gather(*(run(indices, gen_kwargs) for indices, gen_kwargs in batches))
+    return summaries
+
+
 @app.post("/predict")
-async def predict_route(text):
+async def predict_route(text: Optional[str] = None, document: Optional[Document] = Body(None)):
+    if document is None:
+        if text is None:
+            raise HTTPException(status_code=422, detail="Provide `text` as a query parameter or a JSON body")
+        document = Document(text=text)
+
+    if not inference_pool.is_ready():
+        return model_loading_response()
+    check_adapters([document])
     try:
+        gen_kwargs = {**prediction_config.gen_kwargs, **document.gen_overrides()}
+        summary = summary_cache.get(document.text, gen_kwargs)
+        if summary is None:
+            summary = await batch_scheduler.submit(document.text, gen_kwargs)
+            summary_cache.put(document.text, gen_kwargs, summary)
+        return summary
+    except Exception as e:
+        raise e
+
 
-        obj = PredictionPipeline()
-        text = obj.predict(text)
-        return text
+@app.post("/predict/batch")
+async def predict_batch_route(documents: List[Document]):
+    if not inference_pool.is_ready():
+        return model_loading_response()
+    check_adapters(documents)
+    try:
+        summaries = await summarize_documents(documents)
+        return summaries
     except Exception as e:
         raise e
-    
+
+
+
+@app.post("/predict/long")
+async def predict_long_route(document: Document):
+    """
+    Summarizes a document longer than the model's context by summarizing overlapping token windows
+    in parallel batches and then summarizing the joined window summaries.
+    """
+    if not inference_pool.is_ready():
+        return model_loading_response()
+    check_adapters([document])
+    try:
+        overrides = document.gen_overrides()
+        cache_kwargs = {**prediction_config.gen_kwargs, **overrides,
+                        "long_document": [long_document_config.chunk_size,
+                                          long_document_config.chunk_overlap,
+                                          long_document_config.max_reduction_depth]}
+        summary = summary_cache.get(document.text, cache_kwargs)
+        if summary is None:
+            tokenizer = await run_in_threadpool(model_registry.get_tokenizer, prediction_config.tokenizer_path)
+            summarizer = LongDocumentSummarizer(
+                long_document_config, tokenizer,
+                lambda texts: summarize_documents([Document(text=t, **overrides) for t in texts])
+            )
+            summary = await summarizer.summarize(document.text)
+            summary_cache.put(document.text, cache_kwargs, summary)
+        return summary
+    except Exception as e:
+        raise e
+
+
+@app.post("/predict/stream")
+async def predict_stream_route(request: Request, document: Document):
+    """
+    Streams the summary as Server-Sent Events: one `data: {"token": ...}` event per decoded piece
+    followed by `event: end`. Streaming decodes in this process, so with a process pool the model is
+    also loaded here on the first stream. Generation stops when the client disconnects.
+    """
+    if not inference_pool.is_ready():
+        return model_loading_response()
+    if stream_slots.locked():
+        raise ServerOverloadedError(inference_pool_config.retry_after_seconds)
+    check_adapters([document])
+
+    pipeline = await run_in_threadpool(PredictionPipeline, config=prediction_config)
+    cancel_event = threading.Event()
+
+    async def events():
+        async with stream_slots:
+            pieces = pipeline.predict_stream(document.text,
+                                             {**streaming_config.gen_kwargs, **document.gen_overrides()},
+                                             cancel_event)
+            try:
+                while not await request.is_disconnected():
+                    piece = await run_in_threadpool(next, pieces, None)
+                    if piece is None:
+                        yield "event: end\ndata: {}\n\n"
+                        break
+                    yield f"data: {json.dumps({'token': piece})}\n\n"
+            finally:
+                # Stops the background generate call if the client went away mid-stream.
+                cancel_event.set()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 
 if __name__=="__main__":
     uvicorn.run(app, host="0.0.0.0", port=8080)
\ No newline at end of file
@@ -1,60 +1,70 @@
+import argparse
+import dataclasses
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.model_trainer import ModelTrainer
+from textSummarizer.components.import_benchmark import ImportBenchmark
+from textSummarizer.components.load_benchmark import LoadBenchmark
+from textSummarizer.components.inference_benchmark import InferenceBenchmark
+from textSummarizer.components.stage_profiler import HOTSPOT_PROFILERS, StageProfiler
+from textSummarizer.pipeline.stage_runner import StageRunner
 from textSummarizer.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
 from textSummarizer.pipeline.stage_02_data_validation import DataValidationTrainingPipeline
 from textSummarizer.pipeline.stage_03_data_transformation import DataTransformationTrainingPipeline
 from textSummarizer.pipeline.stage_04_model_trainer import ModelTrainerTrainingPipeline
 from textSummarizer.pipeline.stage_05_model_evaluation import ModelEvaluationTrainingPipeline
+from textSummarizer.pipeline.stage_06_model_quantization import ModelQuantizationTrainingPipeline
+from textSummarizer.pipeline.stage_07_model_export import ModelExportTrainingPipeline
+from textSummarizer.pipeline.stage_08_model_distillation import ModelDistillationTrainingPipeline
 
 from textSummarizer.logging import logger
 
 
-STAGE_NAME = "Data Ingestion stage"
-try:
-   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<") 
-   data_ingestion = DataIngestionTrainingPipeline()
-   data_ingestion.main()
-   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-        logger.exception(e)
-        raise e
+STAGES = [
+    DataIngestionTrainingPipeline,
+    DataValidationTrainingPipeline,
+    DataTransformationTrainingPipeline,
+    ModelTrainerTrainingPipeline,
+    ModelDistillationTrainingPipeline,
+    ModelEvaluationTrainingPipeline,
+    ModelQuantizationTrainingPipeline,
+    ModelExportTrainingPipeline,
+]
 
-STAGE_NAME = "Data Validation stage"
-try:
-   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<") 
-   data_validation = DataValidationTrainingPipeline()
-   data_validation.main()
-   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-        logger.exception(e)
-        raise e
 
-STAGE_NAME = "Data Transformation stage"
-try:
-   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<") 
-   data_transformation = DataTransformationTrainingPipeline()
-   data_transformation.main()
-   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-        logger.exception(e)
-        raise e
+# Stage processes (e.g. sharded evaluation workers) are spawned and re-import this module.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stages whose inputs, config or params changed.")
+    parser.add_argument("--force", action="store_true", help="run every stage, even if it is up to date")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="benchmark the training configurations of params.yaml instead of running the pipeline")
+    parser.add_argument("--import-benchmark", action="store_true",
+                        help="check the import time of the serving app against its budget instead of running the pipeline")
+    parser.add_argument("--load-benchmark", action="store_true",
+                        help="compare model loading with and without memory-mapped weights instead of running the pipeline")
+    parser.add_argument("--inference-benchmark", action="store_true",
+                        help="benchmark inference and the serving app on a local fixture model instead of running the pipeline")
+    parser.add_argument("--profile", choices=HOTSPOT_PROFILERS,
+                        help="record the hot functions of every stage that runs, overriding StageProfiler.hotspots")
+    args = parser.parse_args()
 
-STAGE_NAME = "Model Training stage"
-try: 
-   logger.info(f"*******************")
-   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-   model_trainer = ModelTrainerTrainingPipeline()
-   model_trainer.main()
-   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
+    try:
+        config = ConfigurationManager()
+        if args.import_benchmark:
+            ImportBenchmark(config.get_import_benchmark_config()).run()
+        elif args.load_benchmark:
+            LoadBenchmark(config.get_load_benchmark_config(), config.get_prediction_config()).run()
+        elif args.inference_benchmark:
+            InferenceBenchmark(config.get_inference_benchmark_config(), config.get_prediction_config(),
+                               config.get_model_evaluation_config()).run()
+        elif args.benchmark:
+            ModelTrainer(config.get_model_trainer_config()).run_benchmarks(config.get_training_benchmark_config())
+        else:
+            profiler_config = config.get_stage_profiler_config()
+            if args.profile:
+                profiler_config = dataclasses.replace(profiler_config, enabled=True, hotspots=args.profile)
+            profiler = StageProfiler(profiler_config) if profiler_config.enabled else None
+            stage_runner = StageRunner(STAGES, config.get_stage_runner_config(), config, profiler)
+            stage_runner.run(force=args.force)
+    except Exception as e:
         logger.exception(e)
         raise e
-
-STAGE_NAME = "Model Evaluation stage"
-try: 
-   logger.info(f"*******************")
-   logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-   model_evaluation = ModelEvaluationTrainingPipeline()
-   model_evaluation.main()
-   logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-except Exception as e:
-        logger.exception(e)
-        raise e
\ No newline at end of file
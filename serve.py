@@ -0,0 +1,9 @@
+import os
+import uvicorn
+
+
+# Serving-only entry point for the API image built from requirements-serve.txt. Nothing here imports
+# the training pipeline, and the app defers torch and transformers until the model is loaded, so the
+# server starts listening right away and reports readiness on /health/ready once warmed up.
+if __name__ == "__main__":
+    uvicorn.run("app:app", host=os.environ.get("HOST", "0.0.0.0"), port=int(os.environ.get("PORT", "8080")))
@@ -0,0 +1,128 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from textSummarizer.logging import logger
+
+
+ADAPTER_CONFIG_FILE = "adapter_config.json"
+
+# Adapter names become directory names, so anything that could leave `adapter_dir` is rejected.
+ADAPTER_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class UnknownAdapterError(LookupError):
+    def __init__(self, name: str):
+        super().__init__(f"Unknown adapter: {name}")
+        self.name = name
+
+    def __reduce__(self):
+        # Keeps the error intact when it is raised in an inference pool worker process.
+        return (UnknownAdapterError, (self.name,))
+
+
+def get_adapter_path(adapter_dir, name: str) -> str:
+    """
+    The function `get_adapter_path` locates the saved weights of a LoRA adapter.
+
+    :param adapter_dir: The directory holding one subdirectory per adapter
+    :param name: The adapter name, e.g. a tenant or model ID
+    :return: the adapter's directory.
+    """
+    path = os.path.join(str(adapter_dir), name)
+    if not ADAPTER_NAME_RE.match(name) or not os.path.exists(os.path.join(path, ADAPTER_CONFIG_FILE)):
+        raise UnknownAdapterError(name)
+    return path
+
+
+def list_adapters(adapter_dir) -> List[str]:
+    """
+    The function `list_adapters` lists the LoRA adapters saved under a directory.
+
+    :param adapter_dir: The directory holding one subdirectory per adapter
+    :return: the sorted adapter names.
+    """
+    if not os.path.isdir(str(adapter_dir)):
+        return []
+    return sorted(name for name in os.listdir(str(adapter_dir))
+                  if os.path.exists(os.path.join(str(adapter_dir), name, ADAPTER_CONFIG_FILE)))
+
+
+# The AdapterSet class serves many LoRA adapters on one shared base model. Adapters are loaded from
+# `adapter_dir` on first use and the least recently used ones are unloaded beyond `max_loaded`.
+# Selecting an adapter changes the state of the shared model, so generation on the base model or any
+# adapter runs one batch at a time; scale out with process workers rather than threads.
+class AdapterSet:
+    def __init__(self, model, adapter_dir, max_loaded: int):
+        """
+        :param model: The loaded base model
+        :param adapter_dir: The directory holding one subdirectory per adapter
+        :param max_loaded: The maximum number of adapters kept in memory
+        """
+        self.model = model
+        self.adapter_dir = adapter_dir
+        self.max_loaded = max_loaded
+        self._peft_model = None
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"loads": 0, "evictions": 0}
+
+
+    @contextmanager
+    def activate(self, name: Optional[str] = None):
+        """
+        The function `activate` selects an adapter, loading it if needed, and holds the model for the
+        duration of the `with` block.
+
+        :param name: The adapter to apply, None for the plain base model (optional)
+        :return: a context manager yielding the model to run.
+        """
+        with self._lock:
+            if name is None:
+                if self._peft_model is None:
+                    yield self.model
+                else:
+                    with self._peft_model.disable_adapter():
+                        yield self._peft_model
+                return
+
+            self._load(name)
+            self._peft_model.set_adapter(name)
+            yield self._peft_model
+
+
+    def _load(self, name: str):
+        if name in self._loaded:
+            self._loaded.move_to_end(name)
+            return
+
+        path = get_adapter_path(self.adapter_dir, name)
+        # peft is only needed to train or serve adapters.
+        from peft import PeftModel
+
+        if self._peft_model is None:
+            self._peft_model = PeftModel.from_pretrained(self.model, path, adapter_name=name)
+            self._peft_model.eval()
+        else:
+            self._peft_model.load_adapter(path, adapter_name=name)
+        self._loaded[name] = path
+        self._counters["loads"] += 1
+        logger.info(f"Loaded adapter {name} from {path}")
+
+        while len(self._loaded) > self.max_loaded:
+            old, _ = self._loaded.popitem(last=False)
+            self._peft_model.delete_adapter(old)
+            self._counters["evictions"] += 1
+            logger.info(f"Unloaded adapter {old}")
+
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        The function `stats` returns the adapter counters and the adapters currently in memory.
+        :return: a dictionary with load and eviction counts and the loaded adapter names.
+        """
+        counters = dict(self._counters)
+        counters["loaded"] = list(self._loaded)
+        return counters
@@ -0,0 +1,257 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from textSummarizer.entity import BatchSchedulerConfig
+from textSummarizer.components.inference_pool import InferencePool, ServerOverloadedError
+from textSummarizer.components.metrics import serving_metrics
+from textSummarizer.logging import logger, request_logger, trace_id
+
+
+@dataclass
+# The `PendingRequest` class is one queued summarization request waiting to be batched.
+class PendingRequest:
+    text: str
+    gen_kwargs: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    trace_id: Optional[str] = field(default_factory=trace_id.get)
+
+
+# The MicroBatchScheduler class gathers concurrent requests for a short window and runs them as one
+# padded generate batch, sending each result back to its caller's future.
+class MicroBatchScheduler:
+    def __init__(self, run_batch: Callable[[List[str], Dict[str, Any]], Tuple[List[str], Dict[str, Any]]],
+                 config: BatchSchedulerConfig, pool: InferencePool):
+        """
+        :param run_batch: A blocking callable taking a list of texts and generation kwargs and
+        returning one summary per text together with the measurements of the batch, e.g.
+        `predict_batch_in_worker`. It must be picklable when the pool uses processes
+        :param config: The micro-batching configuration (maximum batch size and wait time)
+        :param pool: The inference pool batches are run on. Its worker count bounds the number of
+        batches in flight and its `max_queue_size` bounds the number of waiting texts, queued requests
+        and texts of pre-formed batches alike
+        """
+        self.run_batch = run_batch
+        self.config = config
+        self.pool = pool
+        self._queue = None
+        self._worker = None
+        self._slots = None
+        self._in_flight = 0
+        self._formed_waiting = 0
+        self._stats = {
+            "batches": 0,
+            "requests": 0,
+            "max_batch_size": 0,
+            "last_batch_size": 0,
+            "total_queue_wait_ms": 0.0,
+            "total_batch_latency_ms": 0.0,
+        }
+
+
+    async def start(self):
+        """
+        The function `start` creates the request queue and launches the batching loop on the running
+        event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.pool.config.max_workers)
+        self._worker = asyncio.ensure_future(self._run())
+
+
+    async def stop(self):
+        """
+        The function `stop` cancels the batching loop and fails every request still waiting in the
+        queue.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while self._queue is not None and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+
+    async def submit(self, text: str, gen_kwargs: Dict[str, Any] = None) -> str:
+        """
+        The function `submit` queues one text for summarization and waits for its batch to finish.
+
+        :param text: The input dialogue to summarize
+        :param gen_kwargs: Generation parameters for this request. Only requests with identical
+        parameters are batched together (optional)
+        :return: the generated summary.
+        :raises ServerOverloadedError: if the admission queue is already full.
+        """
+        self.check_admission()
+
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait(PendingRequest(text=text, gen_kwargs=gen_kwargs or {}, future=future))
+        return await future
+
+
+    def check_admission(self, count: int = 1):
+        """
+        The function `check_admission` rejects new work while the admission queue is full.
+
+        :param count: The number of texts to admit, defaults to 1 (optional)
+        :raises ServerOverloadedError: if admitting `count` more texts would leave more than
+        `max_queue_size` texts waiting.
+        """
+        if self.queue_depth() + count > self.pool.config.max_queue_size:
+            raise ServerOverloadedError(self.pool.config.retry_after_seconds)
+
+
+    def queue_depth(self) -> int:
+        """
+        The function `queue_depth` counts the texts waiting for a worker slot.
+        :return: the queued requests plus the texts of pre-formed batches not yet running.
+        """
+        return (self._queue.qsize() if self._queue is not None else 0) + self._formed_waiting
+
+
+    async def run_formed_batch(self, texts: List[str], gen_kwargs: Dict[str, Any] = None) -> List[str]:
+        """
+        The function `run_formed_batch` runs a batch the caller has already assembled. It waits for a
+        free worker slot, so pre-formed batches share the workers fairly with micro-batches instead of
+        piling up in the executor. Its texts count against `max_queue_size` until the batch starts, so
+        callers should `check_admission(len(texts))` right before running it.
+
+        :param texts: The list of input dialogues to summarize together
+        :param gen_kwargs: Generation parameters for the whole batch (optional)
+        :return: the generated summaries, in the same order as `texts`.
+        """
+        enqueued_at = time.perf_counter()
+        self._formed_waiting += len(texts)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._formed_waiting -= len(texts)
+
+        try:
+            started = time.perf_counter()
+            self._in_flight += 1
+            try:
+                summaries, report = await self.pool.run(self.run_batch, texts, gen_kwargs or {})
+            finally:
+                self._in_flight -= 1
+            self._record(len(texts), started, [enqueued_at] * len(texts), time.perf_counter(),
+                         report, [trace_id.get()])
+        finally:
+            self._slots.release()
+        return summaries
+
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        max_wait = self.config.max_wait_ms / 1000
+
+        while True:
+            batch = [await self._queue.get()]
+            # Wait for a free worker before closing the batch, so requests keep accumulating into
+            # larger batches while every worker is busy.
+            await self._slots.acquire()
+            deadline = loop.time() + max_wait
+
+            while len(batch) < self.config.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests with different generation parameters cannot share a generate call.
+            groups = {}
+            for request in batch:
+                if request.future.done():
+                    continue
+                key = tuple(sorted(request.gen_kwargs.items()))
+                groups.setdefault(key, []).append(request)
+
+            asyncio.ensure_future(self._dispatch_groups(list(groups.values())))
+
+
+    async def _dispatch_groups(self, groups: List[List[PendingRequest]]):
+        try:
+            for requests in groups:
+                await self._dispatch(requests)
+        finally:
+            self._slots.release()
+
+
+    async def _dispatch(self, requests: List[PendingRequest]):
+        started = time.perf_counter()
+        self._in_flight += 1
+
+        try:
+            summaries, report = await self.pool.run(
+                self.run_batch, [r.text for r in requests], requests[0].gen_kwargs
+            )
+        except Exception as e:
+            logger.exception(e)
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self._in_flight -= 1
+
+        for request, summary in zip(requests, summaries):
+            if not request.future.done():
+                request.future.set_result(summary)
+
+        self._record(len(requests), started, [r.enqueued_at for r in requests], time.perf_counter(),
+                     report, [r.trace_id for r in requests])
+
+
+    def _record(self, size: int, started: float, enqueued_at: List[float], finished: float,
+                report: Dict[str, Any], trace_ids: List[Optional[str]]):
+        stats = self._stats
+        stats["batches"] += 1
+        stats["requests"] += size
+        stats["last_batch_size"] = size
+        stats["max_batch_size"] = max(stats["max_batch_size"], size)
+        stats["total_queue_wait_ms"] += sum((started - t) * 1000 for t in enqueued_at)
+        stats["total_batch_latency_ms"] += (finished - started) * 1000
+        logger.debug(f"Ran batch of {size} in {(finished - started) * 1000:.1f}ms")
+
+        serving_metrics.observe_batch(size, [started - t for t in enqueued_at], finished - started, report)
+        # A batch serves several requests, so it is logged with the trace IDs of all of them.
+        request_logger.info("batch", extra={"fields": {
+            "trace_ids": trace_ids,
+            "batch_size": size,
+            "queue_wait_ms": [round((started - t) * 1000, 3) for t in enqueued_at],
+            "batch_ms": round((finished - started) * 1000, 3),
+            **{key.replace("_seconds", "_ms"): round(value * 1000, 3) if key.endswith("_seconds") else value
+               for key, value in report.items()},
+        }})
+
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        The function `stats` returns per-batch metrics collected since the scheduler started.
+        :return: a dictionary with batch and request counts, batch sizes, mean queue wait, mean batch
+        latency and the current queue depth.
+        """
+        stats = self._stats
+        batches = stats["batches"] or 1
+        requests = stats["requests"] or 1
+        return {
+            "batches": stats["batches"],
+            "requests": stats["requests"],
+            "mean_batch_size": stats["requests"] / batches,
+            "max_batch_size": stats["max_batch_size"],
+            "last_batch_size": stats["last_batch_size"],
+            "mean_queue_wait_ms": stats["total_queue_wait_ms"] / requests,
+            "mean_batch_latency_ms": stats["total_batch_latency_ms"] / batches,
+            "queue_depth": self.queue_depth(),
+            "batches_in_flight": self._in_flight,
+        }
@@ -1,16 +1,21 @@
+import hashlib
+import json
 import os
 from textSummarizer.logging import logger
 from transformers import AutoTokenizer
-from datasets import load_dataset, load_from_disk
+from datasets import DatasetDict, load_dataset, load_from_disk
 from textSummarizer.entity import DataTransformationConfig
+from textSummarizer.utils.common import get_directory_fingerprint
 
+FINGERPRINT_FILE = "transformation.json"
 
 
 # The DataTransformation class is used for performing data transformations.
 class DataTransformation:
     def __init__(self, config: DataTransformationConfig):
         self.config = config
-        self.tokenizer = AutoTokenizer.from_pretrained(config.tokenizer_name)
+        # Loaded by `convert`, which does not need it when the transformed dataset is up to date.
+        self.tokenizer = None
 
 
     
@@ -18,8 +23,9 @@ class DataTransformation:
         """
         The function `convert_examples_to_features` takes an example batch as input and converts it into
         input and target encodings using a tokenizer. The input encodings are generated by tokenizing
-        the dialogue with a maximum length of 1024 and truncating if necessary. The target encodings are
-        generated by tokenizing the summary with a maximum length of 128 and truncating if necessary.
+        the dialogue with a maximum length of `max_input_length` (1024) and truncating if necessary. The
+        target encodings are generated by tokenizing the summary with a maximum length of
+        `max_target_length` (128) and truncating if necessary.
         The function returns a dictionary containing the input IDs, attention mask, and labels (target
         input IDs).
         
@@ -31,10 +37,9 @@ class DataTransformation:
         associated with these keys are the input encodings, attention masks, and target encodings,
         respectively.
         """
-        input_encodings = self.tokenizer(example_batch['dialogue'] , max_length = 1024, truncation = True )
+        input_encodings = self.tokenizer(example_batch['dialogue'] , max_length = self.config.max_input_length, truncation = True )
         
-        with self.tokenizer.as_target_tokenizer():
-            target_encodings = self.tokenizer(example_batch['summary'], max_length = 128, truncation = True )
+        target_encodings = self.tokenizer(text_target = example_batch['summary'], max_length = self.config.max_target_length, truncation = True )
             
         return {
             'input_ids' : input_encodings['input_ids'],
@@ -43,11 +48,68 @@ class DataTransformation:
         }
     
 
+    def fingerprint(self) -> str:
+        """
+        The function `fingerprint` identifies the transformed dataset from everything that determines
+        its contents: the tokenizer name, the maximum lengths and the ingested dataset.
+        :return: a hex sha256 digest.
+        """
+        payload = json.dumps({
+            "tokenizer_name": str(self.config.tokenizer_name),
+            "max_input_length": self.config.max_input_length,
+            "max_target_length": self.config.max_target_length,
+            "data": get_directory_fingerprint(self.config.data_path),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+    def is_up_to_date(self, output_path, fingerprint: str) -> bool:
+        """
+        The function `is_up_to_date` tells whether a complete transformed dataset with the given
+        fingerprint already exists. The fingerprint file is only written once saving has finished.
+
+        :param output_path: The directory of the transformed dataset
+        :param fingerprint: The fingerprint returned by `fingerprint`
+        :return: True if the transformation can be skipped, False otherwise.
+        """
+        fingerprint_file = os.path.join(output_path, FINGERPRINT_FILE)
+        if not os.path.exists(fingerprint_file):
+            return False
+        with open(fingerprint_file) as f:
+            return json.load(f).get("fingerprint") == fingerprint
+
+
     def convert(self):
         """
         The function converts a dataset from a disk to a different format and saves it to a specified
-        directory.
+        directory. Batches are tokenized by `num_proc` processes with a Rust fast tokenizer, and the
+        work is skipped entirely when an up-to-date transformed dataset already exists.
         """
+        output_path = os.path.join(self.config.root_dir,"samsum_dataset")
+        fingerprint = self.fingerprint()
+        if self.is_up_to_date(output_path, fingerprint):
+            logger.info(f"Transformed dataset at {output_path} is up to date, skipping tokenization")
+            return
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_name, use_fast = True)
+        if not self.tokenizer.is_fast:
+            raise ValueError(f"{self.config.tokenizer_name} has no fast (Rust) tokenizer, install `tokenizers` or convert it")
+
         dataset_samsum = load_from_disk(self.config.data_path)
-        dataset_samsum_pt = dataset_samsum.map(self.convert_examples_to_features, batched = True)
-        dataset_samsum_pt.save_to_disk(os.path.join(self.config.root_dir,"samsum_dataset"))
\ No newline at end of file
+        # An explicit fingerprint spares `datasets` from hashing the tokenizer, and the cache files are
+        # kept out of the ingested dataset, whose fingerprint would otherwise change on every run.
+        cache_dir = os.path.join(self.config.root_dir, "cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        dataset_samsum_pt = DatasetDict({
+            split: dataset.map(self.convert_examples_to_features, batched = True,
+                               batch_size = self.config.batch_size,
+                               num_proc = self.config.num_proc or None,
+                               new_fingerprint = f"{fingerprint[:32]}-{split}",
+                               cache_file_name = os.path.join(cache_dir, f"{fingerprint[:32]}-{split}.arrow"),
+                               desc = f"Tokenizing {split}")
+            for split, dataset in dataset_samsum.items()
+        })
+        dataset_samsum_pt.save_to_disk(output_path)
+
+        with open(os.path.join(output_path, FINGERPRINT_FILE), 'w') as f:
+            json.dump({"fingerprint": fingerprint}, f)
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import torch
+
+
+# The EncoderOutputCache class keeps the encoder hidden states of recently seen inputs, keyed by their
+# token IDs, so a follow-up request for the same dialogue with other generation settings only has to
+# run the decoder. It is an LRU bounded by the memory held by the cached tensors.
+class EncoderOutputCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+    def make_key(self, input_ids: torch.Tensor, adapter: Optional[str] = None) -> str:
+        """
+        The function `make_key` hashes the unpadded token IDs of one input.
+
+        :param input_ids: A 1-D tensor with the input's token IDs, without padding
+        :param adapter: The LoRA adapter applied to the encoder, None for the base model (optional)
+        :return: a hex sha1 digest.
+        """
+        digest = hashlib.sha1(input_ids.cpu().numpy().tobytes())
+        if adapter is not None:
+            digest.update(f"adapter:{adapter}".encode("utf-8"))
+        return digest.hexdigest()
+
+
+    def get(self, key: str) -> Optional[torch.Tensor]:
+        """
+        The function `get` returns the cached encoder states of one input.
+
+        :param key: The key returned by `make_key`
+        :return: a (sequence length, hidden size) tensor, or None on a miss.
+        """
+        with self._lock:
+            hidden = self._entries.get(key)
+            if hidden is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return hidden
+
+
+    def put(self, key: str, hidden: torch.Tensor):
+        """
+        The function `put` stores the encoder states of one input, evicting the least recently used
+        entries until the cache fits in `max_bytes`.
+
+        :param key: The key returned by `make_key`
+        :param hidden: A (sequence length, hidden size) tensor
+        """
+        size = hidden.numel() * hidden.element_size()
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.numel() * previous.element_size()
+
+            self._entries[key] = hidden
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.numel() * old.element_size()
+                self._counters["evictions"] += 1
+
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        The function `stats` returns the cache counters and current size.
+        :return: a dictionary with hit, miss and eviction counts and the number of entries and bytes
+        held.
+        """
+        counters = dict(self._counters)
+        counters["entries"] = len(self._entries)
+        counters["bytes"] = self._bytes
+        return counters
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+from textSummarizer.entity import ImportBenchmarkConfig
+from textSummarizer.logging import logger
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """
+    The function `parse_importtime` reads the report printed by `python -X importtime`.
+
+    :param output: The stderr of the interpreter
+    :return: a dictionary mapping every imported module to its (self, cumulative) import time in
+    microseconds.
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+# The ImportBenchmark class measures how long importing the serving app takes in a fresh interpreter
+# and fails when the import got slower than its budget or pulls in a module that serving must only
+# load on first use.
+class ImportBenchmark:
+    def __init__(self, config: ImportBenchmarkConfig):
+        self.config = config
+
+
+    def measure(self) -> Dict[str, Tuple[int, int]]:
+        """
+        The function `measure` imports `module` in a fresh interpreter `repeats` times, from the
+        current working directory so the app finds its config files.
+        :return: the `parse_importtime` result of the fastest run.
+        """
+        best = None
+        for _ in range(self.config.repeats):
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {self.config.module}"],
+                                    capture_output=True, text=True, cwd=os.getcwd())
+            if result.returncode != 0:
+                raise RuntimeError(f"Importing {self.config.module} failed:\n{result.stderr[-2000:]}")
+            times = parse_importtime(result.stderr)
+            if best is None or times[self.config.module][1] < best[self.config.module][1]:
+                best = times
+        return best
+
+
+    def run(self) -> dict:
+        """
+        The function `run` measures the import, writes the total and the slowest modules by cumulative
+        time to `report_file`, and checks the result against `max_seconds` and `forbidden_modules`.
+        :return: the report.
+        """
+        times = self.measure()
+        total_seconds = times[self.config.module][1] / 1e6
+        forbidden = sorted(name for name in self.config.forbidden_modules if name in times)
+
+        slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:self.config.top_modules]
+        report = {
+            "module": self.config.module,
+            "total_seconds": total_seconds,
+            "max_seconds": self.config.max_seconds,
+            "forbidden_imported": forbidden,
+            "modules": [{"module": name, "self_ms": own / 1000, "cumulative_ms": cumulative / 1000}
+                        for name, (own, cumulative) in slowest],
+        }
+        with open(self.config.report_file, 'w') as f:
+            json.dump(report, f, indent=4)
+
+        logger.info(f"Importing {self.config.module} took {total_seconds:.3f}s (budget {self.config.max_seconds}s)")
+        if forbidden:
+            raise RuntimeError(f"Importing {self.config.module} loads {', '.join(forbidden)}, which must only be imported on first use")
+        if total_seconds > self.config.max_seconds:
+            raise RuntimeError(f"Importing {self.config.module} took {total_seconds:.3f}s, over the {self.config.max_seconds}s budget")
+        return report
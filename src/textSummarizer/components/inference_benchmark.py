@@ -0,0 +1,369 @@
+import dataclasses
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import numpy as np
+import yaml
+from textSummarizer.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from textSummarizer.components.load_benchmark import read_memory
+from textSummarizer.components.stage_profiler import get_git_commit, read_peak_rss_mb, reset_peak_rss
+from textSummarizer.entity import InferenceBenchmarkConfig, ModelEvaluationConfig, PredictionConfig
+from textSummarizer.logging import logger
+
+
+SPEAKERS = ["Amanda", "Jerry", "Hannah", "Eric", "Olivia", "Matt", "Lena", "Tom"]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """
+    The function `latency_summary` summarizes a list of latencies.
+
+    :param latencies_ms: The latencies in milliseconds
+    :return: a dictionary with their mean, median, 90th, 99th percentile and maximum.
+    """
+    return {
+        "latency_mean_ms": float(np.mean(latencies_ms)),
+        "latency_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "latency_p90_ms": float(np.percentile(latencies_ms, 90)),
+        "latency_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "latency_max_ms": float(np.max(latencies_ms)),
+    }
+
+
+def make_dialogues(count: int, words: int, vocab: List[str], seed: int) -> List[str]:
+    """
+    The function `make_dialogues` writes random SAMSum-like dialogues, one "Speaker: words" turn per
+    line, from a fixed vocabulary.
+
+    :param count: The number of dialogues
+    :param words: The number of words per dialogue
+    :param vocab: The words to draw from
+    :param seed: The random seed, so every run measures the same inputs
+    :return: the dialogues.
+    """
+    rng = random.Random(seed)
+    dialogues = []
+    for _ in range(count):
+        turns, left = [], words
+        while left > 0:
+            length = min(left, rng.randint(4, 16))
+            turns.append(f"{rng.choice(SPEAKERS)}: {' '.join(rng.choices(vocab, k=length))}")
+            left -= length
+        dialogues.append("\n".join(turns))
+    return dialogues
+
+
+def build_fixture(config: InferenceBenchmarkConfig) -> Dict[str, str]:
+    """
+    The function `build_fixture` builds a randomly initialized Pegasus model, a word-level tokenizer
+    and a SAMSum-like test split locally, so the benchmark needs no network access. The model has the
+    Pegasus architecture and generation code path; only its size is reduced.
+
+    :param config: The benchmark configuration with the fixture size and seed
+    :return: a dictionary with the paths of the saved model, tokenizer and dataset.
+    """
+    import torch
+    from datasets import Dataset, DatasetDict
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+    from transformers import PegasusConfig, PegasusForConditionalGeneration, PreTrainedTokenizerFast
+
+    paths = {name: os.path.join(config.fixture_dir, name) for name in ("model", "tokenizer", "dataset")}
+    shutil.rmtree(config.fixture_dir, ignore_errors=True)
+
+    special_tokens = ["<pad>", "</s>", "<unk>"]
+    vocab = [f"w{i}" for i in range(config.vocab_size - len(special_tokens) - len(SPEAKERS) - 1)]
+    tokenizer = Tokenizer(models.WordLevel(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.train_from_iterator([" ".join(vocab + SPEAKERS + [":"])],
+                                  trainers.WordLevelTrainer(special_tokens=special_tokens))
+    tokenizer.post_processor = processors.TemplateProcessing(single="$A </s>", special_tokens=[("</s>", 1)])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>",
+                                        unk_token="<unk>", model_max_length=1024)
+    tokenizer.save_pretrained(paths["tokenizer"])
+
+    torch.manual_seed(config.seed)
+    model = PegasusForConditionalGeneration(PegasusConfig(
+        vocab_size=len(tokenizer), d_model=config.d_model,
+        encoder_layers=config.num_layers, decoder_layers=config.num_layers,
+        encoder_attention_heads=config.num_heads, decoder_attention_heads=config.num_heads,
+        encoder_ffn_dim=config.ffn_dim, decoder_ffn_dim=config.ffn_dim, max_position_embeddings=1024,
+        pad_token_id=0, eos_token_id=1, decoder_start_token_id=0,
+    ))
+    model.save_pretrained(paths["model"], safe_serialization=True)
+
+    dialogues = make_dialogues(config.num_dialogues, config.dialogue_words, vocab, config.seed)
+    DatasetDict(test=Dataset.from_dict({
+        "id": [str(i) for i in range(len(dialogues))],
+        "dialogue": dialogues,
+        "summary": [" ".join(d.split()[:16]) for d in dialogues],
+    })).save_to_disk(paths["dataset"])
+
+    logger.info(f"Fixture model with {sum(p.numel() for p in model.parameters())} parameters saved to {config.fixture_dir}")
+    return paths
+
+
+def find_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# The InferenceBenchmark class measures inference on a locally built fixture model: memory footprint,
+# single-request latency, generation cost per `num_beams`/`max_length` setting, `ModelEvaluation`
+# throughput and the throughput of the FastAPI app at several concurrency levels. The report is JSON
+# so CI can keep it and compare it across commits.
+class InferenceBenchmark:
+    def __init__(self, config: InferenceBenchmarkConfig, prediction_config: PredictionConfig,
+                 evaluation_config: ModelEvaluationConfig):
+        self.config = config
+        self.prediction_config = prediction_config
+        self.evaluation_config = evaluation_config
+        self.paths = None
+        self.dialogues = None
+
+
+    def prepare(self):
+        """
+        The function `prepare` builds the fixture and points the prediction configuration at it. The
+        encoder-output cache is turned off, since the warmup call and the generation settings reuse
+        the same dialogues and cached encoder states would leave encoding out of the measurements.
+        """
+        from datasets import load_from_disk
+
+        self.paths = build_fixture(self.config)
+        self.prediction_config = dataclasses.replace(self.prediction_config, model_path=self.paths["model"],
+                                                     tokenizer_path=self.paths["tokenizer"],
+                                                     encoder_cache_bytes=0)
+        self.dialogues = load_from_disk(self.paths["dataset"])["test"]["dialogue"]
+
+
+    def benchmark_latency(self, pipeline) -> dict:
+        """
+        The function `benchmark_latency` summarizes `latency_samples` dialogues one at a time with the
+        serving generation parameters, after one untimed warmup call.
+
+        :param pipeline: The `PredictionPipeline` serving the fixture model
+        :return: the latency percentiles and the mean time of each inference phase.
+        """
+        pipeline.predict_batch(self.dialogues[:1])
+        latencies, phases = [], {}
+        for i in range(self.config.latency_samples):
+            report = {}
+            start = time.perf_counter()
+            pipeline.predict_batch([self.dialogues[i % len(self.dialogues)]], None, report)
+            latencies.append((time.perf_counter() - start) * 1000)
+            for key, value in report.items():
+                if key.endswith("_seconds") and key != "model_load_seconds":
+                    phases.setdefault(key.replace("_seconds", "_mean_ms"), []).append(value * 1000)
+
+        return {**latency_summary(latencies), **{key: float(np.mean(v)) for key, v in phases.items()}}
+
+
+    def benchmark_generation(self, pipeline) -> List[dict]:
+        """
+        The function `benchmark_generation` summarizes one batch of `batch_size` dialogues for every
+        combination of `num_beams` and `max_lengths`.
+
+        :param pipeline: The `PredictionPipeline` serving the fixture model
+        :return: one entry per setting with the batch latency, generated tokens and peak RSS.
+        """
+        texts = self.dialogues[:self.config.batch_size]
+        results = []
+        for num_beams in self.config.num_beams:
+            for max_length in self.config.max_lengths:
+                report = {}
+                reset_peak_rss()
+                start = time.perf_counter()
+                pipeline.predict_batch(texts, {"num_beams": num_beams, "max_length": max_length}, report)
+                seconds = time.perf_counter() - start
+                results.append({
+                    "num_beams": num_beams,
+                    "max_length": max_length,
+                    "batch_size": len(texts),
+                    "batch_ms": seconds * 1000,
+                    "ms_per_dialogue": seconds * 1000 / len(texts),
+                    "output_tokens": report["output_tokens"],
+                    "output_tokens_per_second": report["output_tokens"] / seconds,
+                    "peak_rss_mb": read_peak_rss_mb(),
+                })
+                logger.info(f"num_beams={num_beams} max_length={max_length}: {seconds * 1000:.0f}ms per batch")
+        return results
+
+
+    def benchmark_evaluation(self) -> dict:
+        """
+        The function `benchmark_evaluation` runs the `ModelEvaluation` flow on the fixture test split,
+        generating every prediction from scratch.
+        :return: the wall time and dialogues per second of the evaluation.
+        """
+        from textSummarizer.components.model_evaluation import ModelEvaluation
+
+        root_dir = os.path.join(self.config.root_dir, "evaluation")
+        shutil.rmtree(root_dir, ignore_errors=True)
+        config = dataclasses.replace(self.evaluation_config, root_dir=root_dir, data_path=self.paths["dataset"],
+                                     model_path=self.paths["model"], tokenizer_path=self.paths["tokenizer"],
+                                     predictions_dir=os.path.join(root_dir, "predictions"),
+                                     metric_file_name=os.path.join(root_dir, "metrics.csv"), num_samples=0)
+        os.makedirs(config.predictions_dir, exist_ok=True)
+
+        start = time.perf_counter()
+        ModelEvaluation(config=config).evaluate()
+        seconds = time.perf_counter() - start
+        return {"dialogues": len(self.dialogues), "num_shards": config.num_shards, "seconds": seconds,
+                "dialogues_per_second": len(self.dialogues) / seconds}
+
+
+    def write_app_config(self, workdir: str):
+        """
+        The function `write_app_config` writes the config.yaml and params.yaml the app is started with:
+        the project's own, with the prediction paths pointing at the fixture and the summary and
+        encoder-output caches disabled. Every concurrency level replays the same dialogues, so every
+        request must run the full model.
+
+        :param workdir: The working directory of the app process
+        """
+        with open(CONFIG_FILE_PATH) as f:
+            config = yaml.safe_load(f)
+        with open(PARAMS_FILE_PATH) as f:
+            params = yaml.safe_load(f)
+
+        config["prediction"]["model_path"] = os.path.abspath(self.paths["model"])
+        config["prediction"]["tokenizer_path"] = os.path.abspath(self.paths["tokenizer"])
+        params["SummaryCache"]["enabled"] = False
+        params["EncoderCache"]["enabled"] = False
+
+        os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+        with open(os.path.join(workdir, CONFIG_FILE_PATH), 'w') as f:
+            yaml.safe_dump(config, f, sort_keys=False)
+        with open(os.path.join(workdir, PARAMS_FILE_PATH), 'w') as f:
+            yaml.safe_dump(params, f, sort_keys=False)
+
+
+    def wait_until_ready(self, url: str, server: subprocess.Popen):
+        deadline = time.monotonic() + self.config.startup_timeout_seconds
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"The app exited with code {server.returncode} before it was ready")
+            try:
+                with urllib.request.urlopen(f"{url}/health/ready", timeout=5) as response:
+                    if response.status == 200:
+                        return
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"The app was not ready after {self.config.startup_timeout_seconds}s")
+
+
+    def load_test(self, url: str, concurrency: int) -> dict:
+        """
+        The function `load_test` sends `requests_per_level` summarization requests to the app from
+        `concurrency` clients at once, each a different dialogue.
+
+        :param url: The base URL of the app
+        :param concurrency: The number of concurrent clients
+        :return: the throughput, error count and latency percentiles of the successful requests.
+        """
+        def send(i):
+            body = json.dumps({"text": self.dialogues[i % len(self.dialogues)]}).encode("utf-8")
+            request = urllib.request.Request(f"{url}/predict", data=body, headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=300) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return ok, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(self.config.requests_per_level)))
+        seconds = time.perf_counter() - start
+
+        latencies = [latency for ok, latency in results if ok]
+        result = {"concurrency": concurrency, "requests": len(results), "errors": len(results) - len(latencies),
+                  "seconds": seconds, "throughput_rps": len(latencies) / seconds}
+        if latencies:
+            result.update(latency_summary(latencies))
+        logger.info(f"Concurrency {concurrency}: {result['throughput_rps']:.1f} requests/s, {result['errors']} errors")
+        return result
+
+
+    def benchmark_app(self) -> dict:
+        """
+        The function `benchmark_app` starts the FastAPI app on the fixture model with uvicorn in its
+        own process, as it is deployed, and load tests it at every concurrency level.
+        :return: the startup time, one `load_test` result per level and the app's memory afterwards.
+        """
+        workdir = os.path.join(self.config.root_dir, "app")
+        self.write_app_config(workdir)
+        port = find_free_port()
+        url = f"http://127.0.0.1:{port}"
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+                                   "--port", str(port), "--log-level", "warning"], cwd=workdir, env=env)
+        try:
+            self.wait_until_ready(url, server)
+            startup_seconds = time.perf_counter() - start
+            levels = [self.load_test(url, concurrency) for concurrency in self.config.concurrency_levels]
+            memory = read_memory(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        return {"startup_seconds": startup_seconds, "levels": levels, "memory": memory}
+
+
+    def run(self) -> dict:
+        """
+        The function `run` builds the fixture, runs every measurement and writes the report to
+        `report_file`.
+        :return: the report.
+        """
+        import torch
+        from textSummarizer.components.model_registry import model_registry
+        from textSummarizer.pipeline.prediction import PredictionPipeline
+
+        self.prepare()
+
+        before = read_memory()
+        handle = model_registry.get_for_config(self.prediction_config)
+        loaded = read_memory()
+        pipeline = PredictionPipeline(handle, self.prediction_config)
+
+        report = {
+            "git_commit": get_git_commit(),
+            "python": sys.version.split()[0],
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "fixture": {
+                "d_model": self.config.d_model, "num_layers": self.config.num_layers,
+                "vocab_size": len(handle.tokenizer), "dialogue_words": self.config.dialogue_words,
+                "parameters": sum(p.numel() for p in handle.model.parameters()),
+            },
+            "memory": {
+                "model_load_seconds": handle.load_seconds,
+                "model_rss_mb": loaded["rss_mb"] - before["rss_mb"],
+                "model_pss_mb": loaded["pss_mb"] - before["pss_mb"],
+            },
+            "latency": self.benchmark_latency(pipeline),
+            "generation": self.benchmark_generation(pipeline),
+            "evaluation": self.benchmark_evaluation(),
+            "app": self.benchmark_app(),
+        }
+
+        with open(self.config.report_file, 'w') as f:
+            json.dump(report, f, indent=4)
+        logger.info(f"Inference benchmark report written to {self.config.report_file}")
+        return report
@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from textSummarizer.entity import InferencePoolConfig
+from textSummarizer.logging import logger
+
+
+# The ServerOverloadedError class is raised when a request cannot be admitted because the inference
+# queue is full. `retry_after` is the number of seconds the client should wait before retrying.
+class ServerOverloadedError(RuntimeError):
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+def _wait_at_barrier(barrier):
+    # A worker blocked here cannot take another warmup task, so every task needs its own worker.
+    barrier.wait()
+
+
+# The InferencePool class runs blocking inference on a thread or process pool so the event loop stays
+# responsive while the model is generating.
+class InferencePool:
+    def __init__(self, config: InferencePoolConfig, initializer = None, initargs = ()):
+        """
+        :param config: The pool configuration (executor type, worker count and admission limits)
+        :param initializer: A callable run once in every worker before it takes any work, typically
+        used to load the model into that worker (optional)
+        :param initargs: The arguments passed to `initializer` (optional)
+        """
+        self.config = config
+        self._ready = False
+
+        if config.executor == "process":
+            # Spawned workers do not inherit the parent's torch thread pools or loaded weights.
+            self.executor = ProcessPoolExecutor(max_workers=config.max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=initializer, initargs=initargs)
+        elif config.executor == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=config.max_workers,
+                                               thread_name_prefix="inference",
+                                               initializer=initializer, initargs=initargs)
+        else:
+            raise ValueError(f"Unknown executor type: {config.executor}")
+
+
+    async def run(self, fn, *args):
+        """
+        The function `run` executes a blocking callable on the pool and awaits its result.
+
+        :param fn: The callable to run. It must be picklable when the pool uses processes
+        :param args: The positional arguments passed to `fn`
+        :return: the value returned by `fn`.
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor, fn, *args)
+
+
+    async def warmup(self):
+        """
+        The function `warmup` starts every worker so their initializer (model loading) runs before
+        traffic arrives, then marks the pool as ready. Executors start workers on demand and hand
+        tasks to idle ones, so the warmup tasks wait for each other at a barrier: the pool is only
+        marked ready once `max_workers` distinct workers have finished their initializer.
+        """
+        manager = None
+        if self.config.executor == "process":
+            manager = multiprocessing.get_context("spawn").Manager()
+            barrier = manager.Barrier(self.config.max_workers)
+        else:
+            barrier = threading.Barrier(self.config.max_workers)
+
+        try:
+            try:
+                await asyncio.gather(*(self.run(_wait_at_barrier, barrier) for _ in range(self.config.max_workers)))
+            except Exception:
+                # Release the workers still waiting for one that failed to start.
+                barrier.abort()
+                raise
+            self._ready = True
+            logger.info(f"Inference pool ready with {self.config.max_workers} {self.config.executor} worker(s)")
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            if manager is not None:
+                manager.shutdown()
+
+
+    def mark_ready(self):
+        """
+        The function `mark_ready` marks the pool as ready without warming it up, so workers load the
+        model on first use instead.
+        """
+        self._ready = True
+
+
+    def is_ready(self) -> bool:
+        """
+        The function `is_ready` reports whether the pool has been warmed up.
+        :return: True once the pool can take traffic, False otherwise.
+        """
+        return self._ready
+
+
+    def shutdown(self):
+        """
+        The function `shutdown` stops the pool without waiting for queued work.
+        """
+        self.executor.shutdown(wait=False)
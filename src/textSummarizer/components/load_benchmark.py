@@ -0,0 +1,109 @@
+import dataclasses
+import json
+import multiprocessing
+import time
+from typing import Dict
+from textSummarizer.entity import LoadBenchmarkConfig, PredictionConfig
+from textSummarizer.logging import logger
+
+
+LOAD_MODES = {"from_pretrained": False, "mmap": True}
+
+
+def read_memory(pid = "self") -> Dict[str, float]:
+    """
+    The function `read_memory` reads the memory use of a process from the kernel.
+
+    :param pid: The ID of the process, defaults to the current process (optional)
+    :return: a dictionary with the resident (rss), proportional (pss, shared pages divided among the
+    processes mapping them), private and shared memory in MB.
+    """
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = {line.split(":")[0]: int(line.split()[1]) for line in f.readlines()[1:]}
+    return {
+        "rss_mb": fields["Rss"] / 1024,
+        "pss_mb": fields["Pss"] / 1024,
+        "private_mb": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024,
+        "shared_mb": (fields["Shared_Clean"] + fields["Shared_Dirty"]) / 1024,
+    }
+
+
+def load_worker(config: PredictionConfig, barrier, results):
+    """
+    The function `load_worker` is the entry point of one benchmark worker. It loads and warms up the
+    model like a serving worker, then reports its timings and its memory once every worker holds the
+    model, so the shared pages are divided among all of them.
+
+    :param config: The prediction configuration of the model to load
+    :param barrier: The barrier shared by all workers
+    :param results: The queue receiving this worker's measurements
+    """
+    from textSummarizer.components.model_registry import model_registry
+
+    baseline = read_memory()
+    handle = model_registry.get_for_config(config)
+    start = time.perf_counter()
+    model_registry.warmup(config)
+    warmup_seconds = time.perf_counter() - start
+
+    barrier.wait()
+    memory = read_memory()
+    results.put({
+        "load_seconds": handle.load_seconds,
+        "warmup_seconds": warmup_seconds,
+        **memory,
+        "model_pss_mb": memory["pss_mb"] - baseline["pss_mb"],
+    })
+    barrier.wait()
+
+
+# The LoadBenchmark class compares `from_pretrained` with memory-mapped safetensors loading by starting
+# `num_workers` processes that each load the served model at the same time, as several serving
+# workers on one node do, and reporting each worker's load time and memory.
+class LoadBenchmark:
+    def __init__(self, config: LoadBenchmarkConfig, prediction_config: PredictionConfig):
+        self.config = config
+        self.prediction_config = dataclasses.replace(prediction_config, device="cpu", encoder_cache_bytes=0,
+                                                     max_loaded_adapters=0)
+
+
+    def run_mode(self, mmap_weights: bool) -> list:
+        """
+        The function `run_mode` runs one group of concurrent workers.
+
+        :param mmap_weights: Whether the workers memory-map the weights
+        :return: the measurements of every worker.
+        """
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(self.config.num_workers)
+        results = context.Queue()
+        config = dataclasses.replace(self.prediction_config, mmap_weights=mmap_weights)
+
+        workers = [context.Process(target=load_worker, args=(config, barrier, results))
+                   for _ in range(self.config.num_workers)]
+        for worker in workers:
+            worker.start()
+        measurements = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        return measurements
+
+
+    def run(self) -> dict:
+        """
+        The function `run` benchmarks every loading mode and writes the per-worker measurements and
+        their means to `report_file`.
+        :return: the report, keyed by loading mode.
+        """
+        report = {}
+        for mode, mmap_weights in LOAD_MODES.items():
+            workers = self.run_mode(mmap_weights)
+            mean = {key: sum(w[key] for w in workers) / len(workers) for key in workers[0]}
+            report[mode] = {"mean": mean, "workers": workers}
+            logger.info(f"{mode}: load {mean['load_seconds']:.2f}s, warmup {mean['warmup_seconds']:.2f}s, "
+                        f"RSS {mean['rss_mb']:.0f} MB, PSS {mean['pss_mb']:.0f} MB per worker "
+                        f"with {self.config.num_workers} workers")
+
+        with open(self.config.report_file, 'w') as f:
+            json.dump(report, f, indent=4)
+        return report
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, List
+from textSummarizer.entity import LongDocumentConfig
+from textSummarizer.logging import logger
+
+
+# The LongDocumentSummarizer class summarizes inputs longer than the model's context with a
+# hierarchical map-reduce: the text is split into overlapping token windows, every window is
+# summarized, and the joined window summaries are summarized again until they fit in one window.
+class LongDocumentSummarizer:
+    def __init__(self, config: LongDocumentConfig, tokenizer,
+                 summarize_many: Callable[[List[str]], Awaitable[List[str]]]):
+        """
+        :param config: The chunking and reduction configuration, validated by
+        `ConfigurationManager.get_long_document_config`
+        :param tokenizer: The tokenizer of the summarization model, used to measure and split texts
+        :param summarize_many: An async callable summarizing a list of texts, returning the summaries
+        in input order. It is expected to batch and parallelise the work itself
+        """
+        self.config = config
+        self.tokenizer = tokenizer
+        self.summarize_many = summarize_many
+
+
+    def split(self, text: str) -> List[str]:
+        """
+        The function `split` cuts a text into overlapping windows of at most `chunk_size` tokens.
+
+        :param text: The text to split
+        :return: the list of window texts, a single element if the text already fits.
+        """
+        # Leave room for the end-of-sequence token the tokenizer appends to every window.
+        window = self.config.chunk_size - 1
+        stride = window - self.config.chunk_overlap
+        ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+        if len(ids) <= window:
+            return [text]
+
+        chunks = []
+        for start in range(0, len(ids), stride):
+            chunks.append(self.tokenizer.decode(ids[start:start + window], skip_special_tokens=True))
+            if start + window >= len(ids):
+                break
+
+        return chunks
+
+
+    async def summarize(self, text: str) -> str:
+        """
+        The function `summarize` runs the map-reduce. Every round summarizes all windows of the current
+        text at once; after `max_reduction_depth` rounds the remaining text is summarized as is, and
+        anything beyond the model's context is truncated.
+
+        :param text: The long input text
+        :return: the final summary.
+        """
+        loop = asyncio.get_event_loop()
+
+        for depth in range(self.config.max_reduction_depth):
+            chunks = await loop.run_in_executor(None, self.split, text)
+            if len(chunks) == 1:
+                break
+            logger.info(f"Reduction round {depth + 1}: summarizing {len(chunks)} chunks")
+            summaries = await self.summarize_many(chunks)
+            text = "\n".join(summaries)
+
+        return (await self.summarize_many([text]))[0]
@@ -0,0 +1,269 @@
+import bisect
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+# Only the standard library is imported here: the serving app imports this module at startup and it
+# must not add to its import time.
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    """
+    The function `format_labels` renders a label set in the Prometheus text format.
+
+    :param names: The label names
+    :param values: The matching label values
+    :return: a string such as `{route="/predict",status="200"}`, empty when there are no labels.
+    """
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# The Metric class holds one value per label set. Subclasses define how values change and how they
+# are rendered.
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, format_labels(self.labels, key), value) for key, value in self._values.items()]
+
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+# The Counter class is a total that only goes up, e.g. the number of requests served.
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        The function `inc` adds `amount` to the counter of a label set.
+
+        :param amount: The non-negative amount to add, defaults to 1 (optional)
+        :param labels: The value of every label of the counter
+        """
+        if amount < 0:
+            raise ValueError(f"{self.name} can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def set_total(self, total: float, **labels):
+        """
+        The function `set_total` copies a total that is counted elsewhere, e.g. in a component's
+        `stats()`, into the counter.
+
+        :param total: The current total
+        :param labels: The value of every label of the counter
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = total
+
+
+# The Gauge class is a value that goes up and down, e.g. the number of queued requests.
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        """
+        The function `set` sets the gauge of a label set.
+
+        :param value: The new value
+        :param labels: The value of every label of the gauge
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+# The Histogram class counts observations into cumulative buckets and keeps their count and sum, so
+# that quantiles can be computed over any time window when the metrics are scraped.
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+
+    def observe(self, value: float, **labels):
+        """
+        The function `observe` records one observation.
+
+        :param value: The observed value, e.g. a latency in seconds
+        :param labels: The value of every label of the histogram
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = format_labels(self.labels + ("le",), key + (format_value(bound),))
+                    samples.append((f"{self.name}_bucket", labels, cumulative))
+                labels = format_labels(self.labels, key)
+                samples.append((f"{self.name}_count", labels, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+        return samples
+
+
+# The MetricsRegistry class creates metrics and renders all of them in the Prometheus text exposition
+# format.
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+
+    def render(self) -> str:
+        """
+        The function `render` renders every registered metric.
+        :return: the metrics page served on `/metrics`.
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# The ServingMetrics class defines the metrics of the serving app. Inference may run in pool worker
+# processes, so workers return their measurements with each batch (see `PredictionPipeline.predict_batch`)
+# and they are recorded here, in the process that serves `/metrics`.
+class ServingMetrics:
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.requests = r.counter("summarizer_requests_total", "HTTP requests served.", ("route", "status"))
+        self.request_seconds = r.histogram("summarizer_request_seconds", "HTTP request latency.", ("route",))
+        self.queue_depth = r.gauge("summarizer_queue_depth", "Texts waiting for a worker slot.")
+        self.batches_in_flight = r.gauge("summarizer_batches_in_flight", "Batches running on the inference pool.")
+        self.queue_wait_seconds = r.histogram("summarizer_queue_wait_seconds",
+                                              "Time requests wait before their batch starts.")
+        self.batch_size = r.histogram("summarizer_batch_size", "Texts per generate batch.",
+                                      buckets=BATCH_SIZE_BUCKETS)
+        self.batch_seconds = r.histogram("summarizer_batch_seconds", "Latency of a batch on the inference pool.")
+        self.phase_seconds = r.histogram("summarizer_phase_seconds",
+                                         "Time spent per batch in each inference phase.", ("phase",))
+        self.tokens = r.counter("summarizer_tokens_total", "Tokens read and generated.", ("direction",))
+        self.encoder_cache = r.counter("summarizer_encoder_cache_lookups_total",
+                                       "Encoder-output cache lookups.", ("result",))
+        self.summary_cache = r.counter("summarizer_summary_cache_lookups_total",
+                                       "Summary cache lookups.", ("result",))
+        self.model_load_seconds = r.gauge("summarizer_model_load_seconds",
+                                          "Time the serving workers took to load the model.")
+
+
+    def observe_request(self, route: str, status: int, seconds: float):
+        """
+        The function `observe_request` records one HTTP request.
+
+        :param route: The route template, e.g. "/predict"
+        :param status: The HTTP status code
+        :param seconds: The time taken to produce the response
+        """
+        self.requests.inc(route=route, status=str(status))
+        self.request_seconds.observe(seconds, route=route)
+
+
+    def observe_batch(self, size: int, queue_waits: List[float], seconds: float, report: Dict[str, float]):
+        """
+        The function `observe_batch` records one batch run by the micro-batch scheduler.
+
+        :param size: The number of texts in the batch
+        :param queue_waits: The queue wait of every request of the batch, in seconds
+        :param seconds: The time the batch took on the inference pool
+        :param report: The measurements returned by the worker, see `PredictionPipeline.predict_batch`
+        """
+        self.batch_size.observe(size)
+        self.batch_seconds.observe(seconds)
+        for wait in queue_waits:
+            self.queue_wait_seconds.observe(wait)
+
+        for phase in ("tokenize", "encode", "decode", "detokenize"):
+            if f"{phase}_seconds" in report:
+                self.phase_seconds.observe(report[f"{phase}_seconds"], phase=phase)
+        self.tokens.inc(report.get("input_tokens", 0), direction="input")
+        self.tokens.inc(report.get("output_tokens", 0), direction="output")
+        self.encoder_cache.inc(report.get("encoder_cache_hits", 0), result="hit")
+        self.encoder_cache.inc(report.get("encoder_cache_misses", 0), result="miss")
+        if "model_load_seconds" in report:
+            self.model_load_seconds.set(report["model_load_seconds"])
+
+
+    def observe_summary_cache(self, stats: Dict[str, int]):
+        """
+        The function `observe_summary_cache` copies the counters of `SummaryCache.stats`.
+
+        :param stats: The summary cache statistics
+        """
+        self.summary_cache.set_total(stats["memory_hits"], result="memory_hit")
+        self.summary_cache.set_total(stats["disk_hits"], result="disk_hit")
+        self.summary_cache.set_total(stats["misses"], result="miss")
+
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+# Process-wide metrics of the serving app.
+serving_metrics = ServingMetrics()
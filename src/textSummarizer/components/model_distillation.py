@@ -0,0 +1,196 @@
+import copy
+import dataclasses
+import os
+import time
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, DataCollatorForSeq2Seq, TrainingArguments
+from datasets import load_from_disk
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from textSummarizer.components.model_evaluation import ModelEvaluation
+from textSummarizer.components.model_trainer import ThroughputCallback, TokenBudgetCollator, TokenBudgetTrainer
+from textSummarizer.entity import ModelDistillationConfig, ModelEvaluationConfig
+from textSummarizer.logging import logger
+
+
+def build_student(teacher, num_decoder_layers: int):
+    """
+    The function `build_student` copies the teacher and keeps only `num_decoder_layers` of its decoder
+    layers, evenly spaced and always including the first and last one, so the student starts from the
+    teacher's weights rather than from scratch.
+
+    :param teacher: The trained seq2seq model
+    :param num_decoder_layers: The number of decoder layers of the student
+    :return: the student model.
+    """
+    layers = teacher.get_decoder().layers
+    if not 0 < num_decoder_layers < len(layers):
+        raise ValueError(f"The student needs between 1 and {len(layers) - 1} decoder layers, got {num_decoder_layers}")
+
+    if num_decoder_layers == 1:
+        keep = [0]
+    else:
+        keep = [round(i * (len(layers) - 1) / (num_decoder_layers - 1)) for i in range(num_decoder_layers)]
+
+    student = copy.deepcopy(teacher)
+    student.get_decoder().layers = torch.nn.ModuleList([student.get_decoder().layers[i] for i in keep])
+    student.config.decoder_layers = num_decoder_layers
+    logger.info(f"Student keeps decoder layers {keep} of {len(layers)}")
+    return student
+
+
+# The DistillationTrainer class trains the student on a mix of the cross-entropy with the reference
+# summaries and the KL divergence from the teacher's temperature-softened next-token distributions.
+class DistillationTrainer(TokenBudgetTrainer):
+    def __init__(self, *args, teacher, temperature: float, alpha: float, **kwargs):
+        """
+        :param teacher: The frozen teacher model, on the same device as the student
+        :param temperature: The softmax temperature applied to both models' logits
+        :param alpha: The weight of the cross-entropy with the references, the teacher term gets 1 - alpha
+        """
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher
+        self.temperature = temperature
+        self.alpha = alpha
+
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        # Both models read the same decoder inputs. The token-budget collator does not build them.
+        if "decoder_input_ids" not in inputs:
+            inputs["decoder_input_ids"] = self.teacher.prepare_decoder_input_ids_from_labels(labels=inputs["labels"])
+        outputs = model(**inputs)
+        # Without labels the teacher skips the cross-entropy loss, which would be thrown away.
+        with torch.no_grad():
+            teacher_logits = self.teacher(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                                          decoder_input_ids=inputs["decoder_input_ids"]).logits
+
+        mask = inputs["labels"] != -100
+        T = self.temperature
+        distillation_loss = F.kl_div(F.log_softmax(outputs.logits[mask] / T, dim=-1),
+                                     F.softmax(teacher_logits[mask] / T, dim=-1),
+                                     reduction="batchmean") * T ** 2
+
+        loss = self.alpha * outputs.loss + (1 - self.alpha) * distillation_loss
+        return (loss, outputs) if return_outputs else loss
+
+
+# The ModelDistillation class distills the trained model into a student with fewer decoder layers and
+# compares the ROUGE scores and CPU latency of teacher and student.
+class ModelDistillation:
+    def __init__(self, config: ModelDistillationConfig, evaluation_config: ModelEvaluationConfig):
+        self.config = config
+        self.evaluation_config = evaluation_config
+
+
+    def distill(self):
+        """
+        The function `distill` trains the student on the transformed SAMSum training split with the
+        teacher's logits and saves it with its tokenizer to `student_model_path`.
+        """
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
+        teacher = AutoModelForSeq2SeqLM.from_pretrained(self.config.teacher_model_path).to(device)
+        teacher.eval()
+        student = build_student(teacher, self.config.student_decoder_layers)
+
+        #loading data, memory-mapped from the Arrow files rather than copied into RAM
+        dataset_samsum_pt = load_from_disk(self.config.data_path, keep_in_memory=False)
+
+        trainer_args = TrainingArguments(
+            output_dir=self.config.root_dir, num_train_epochs=self.config.num_train_epochs,
+            learning_rate=self.config.learning_rate, warmup_steps=self.config.warmup_steps,
+            per_device_train_batch_size=1, gradient_accumulation_steps=self.config.gradient_accumulation_steps,
+            logging_steps=10, eval_strategy="no", save_strategy="no", report_to="none"
+        )
+
+        if self.config.max_tokens_per_batch:
+            data_collator = TokenBudgetCollator(tokenizer.pad_token_id)
+        else:
+            data_collator = DataCollatorForSeq2Seq(tokenizer, model=student)
+
+        throughput = ThroughputCallback()
+        trainer = DistillationTrainer(model=student, args=trainer_args, tokenizer=tokenizer,
+                                      data_collator=data_collator, train_dataset=dataset_samsum_pt["train"],
+                                      callbacks=[throughput], max_tokens_per_batch=self.config.max_tokens_per_batch,
+                                      throughput=throughput, teacher=teacher,
+                                      temperature=self.config.temperature, alpha=self.config.alpha)
+        trainer.train()
+
+        student.save_pretrained(self.config.student_model_path, safe_serialization=True)
+        tokenizer.save_pretrained(self.config.student_model_path)
+        logger.info(f"Student saved to {self.config.student_model_path}")
+
+
+    def measure_latency(self, model, tokenizer, dialogues) -> dict:
+        """
+        The function `measure_latency` times the summarization of single dialogues on the CPU with the
+        serving generation parameters, after one untimed warmup call.
+
+        :param model: The model to time, on the CPU
+        :param tokenizer: The tokenizer shared by teacher and student
+        :param dialogues: The dialogues to summarize one at a time
+        :return: a dictionary with the mean, median and 95th percentile latency in milliseconds.
+        """
+        latencies = []
+        for position, dialogue in enumerate([dialogues[0]] + list(dialogues)):
+            inputs = tokenizer([dialogue], max_length=1024, truncation=True, return_tensors="pt")
+            start = time.perf_counter()
+            with torch.inference_mode():
+                model.generate(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                               **self.config.gen_kwargs)
+            if position:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        return {
+            "latency_mean_ms": float(np.mean(latencies)),
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+        }
+
+
+    def evaluate(self, name: str, model_path) -> dict:
+        """
+        The function `evaluate` scores one model on the first `num_samples` test dialogues with the
+        `ModelEvaluation` flow, storing its predictions and metrics under `root_dir/name`.
+
+        :param name: Either "teacher" or "student"
+        :param model_path: The directory of the model to score
+        :return: a dictionary mapping each ROUGE variant to its mean F-measure.
+        """
+        root_dir = os.path.join(self.config.root_dir, name)
+        config = dataclasses.replace(self.evaluation_config, root_dir=root_dir, model_path=model_path,
+                                     predictions_dir=os.path.join(root_dir, "predictions"),
+                                     metric_file_name=os.path.join(root_dir, "metrics.csv"),
+                                     num_samples=self.config.num_samples)
+        os.makedirs(config.predictions_dir, exist_ok=True)
+        return ModelEvaluation(config=config).evaluate()
+
+
+    def report(self) -> pd.DataFrame:
+        """
+        The function `report` compares teacher and student on ROUGE, size and CPU latency and writes
+        the comparison to `report_file`.
+        :return: a data frame with one row per model.
+        """
+        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
+        dialogues = load_from_disk(self.config.data_path)['test'][0:self.config.latency_samples]['dialogue']
+
+        rows = {}
+        for name, model_path in (("teacher", self.config.teacher_model_path),
+                                 ("student", self.config.student_model_path)):
+            scores = self.evaluate(name, model_path)
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+            model.eval()
+            rows[name] = {
+                **scores,
+                **self.measure_latency(model, tokenizer, dialogues),
+                "decoder_layers": model.config.decoder_layers,
+                "parameters": sum(p.numel() for p in model.parameters()),
+            }
+            logger.info(f"{name}: {rows[name]}")
+
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        df["speedup"] = df.loc["teacher", "latency_mean_ms"] / df["latency_mean_ms"]
+        df.to_csv(self.config.report_file)
+        return df
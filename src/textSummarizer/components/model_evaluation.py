@@ -1,115 +1,302 @@
+import glob
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
-from datasets import load_dataset, load_from_disk, load_metric
+from datasets import load_dataset, load_from_disk
 import torch
 import pandas as pd
 from tqdm import tqdm
 from textSummarizer.entity import ModelEvaluationConfig
+from textSummarizer.logging import logger
+from textSummarizer.utils.common import get_directory_fingerprint, length_grouped_batches
+from textSummarizer.utils.rouge import compute_rouge
+
+
+PREDICTIONS_RUN_FILE = "run.json"
+
 
 # The ModelEvaluation class is used for evaluating the performance of a machine learning model.
 class ModelEvaluation:
     def __init__(self, config: ModelEvaluationConfig):
         self.config = config
     
-    def generate_batch_sized_chunks(self,list_of_elements, batch_size):
+    def generate_token_budget_batches(self, encodings, tokenizer, max_tokens_per_batch):
         """
-        The function generates batch-sized chunks from a given list of elements.
+        The function lazily yields padded batches built from examples of similar length. Examples are
+        sorted by token length and grouped so that no batch holds more than `max_tokens_per_batch`
+        tokens once padded, and each batch is padded only to its own longest example.
         
-        :param list_of_elements: The list of elements that you want to split into smaller batches
-        :param batch_size: The batch_size parameter determines the number of elements in each
-        batch-sized chunk
+        :param encodings: The tokenized examples, a dictionary with unpadded `input_ids` and
+        `attention_mask` lists
+        :param tokenizer: The tokenizer used to pad each batch
+        :param max_tokens_per_batch: The maximum number of tokens, padding included, in a batch
+        :return: a generator of (indices, inputs) pairs, where indices are the positions of the batch
+        members in `encodings` and inputs are the padded tensors.
         """
-        #split the dataset into smaller batches that we can process simultaneously
-        #yield successive batch-sized chunks from list_of_elements."""
-        for i in range(0, len(list_of_elements), batch_size):
-            yield list_of_elements[i : i + batch_size]
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        for indices in length_grouped_batches(lengths, max_tokens=max_tokens_per_batch):
+            features = [{"input_ids": encodings["input_ids"][i],
+                         "attention_mask": encodings["attention_mask"][i]} for i in indices]
+            yield indices, tokenizer.pad(features, padding="longest", return_tensors="pt")
 
     
-    def calculate_metric_on_test_ds(self,dataset, metric, model, tokenizer, 
-                               batch_size=16, device="cuda" if torch.cuda.is_available() else "cpu", 
-                               column_text="article", 
-                               column_summary="highlights"):
-        
+    def generate_summaries(self, texts, model, tokenizer, max_tokens_per_batch=4096,
+                           device="cuda" if torch.cuda.is_available() else "cpu", on_batch=None):
         """
-        The function `calculate_metric_on_test_ds` takes in a dataset, a metric, a model, a tokenizer,
-        and other optional parameters, and calculates a metric score (e.g., ROUGE) on the test dataset
-        using the model's generated summaries and the target summaries.
+        The function `generate_summaries` summarizes a list of texts in token-budget batches.
         
-        :param dataset: The dataset parameter is the test dataset that contains the articles and their
-        corresponding summaries. It should be a pandas DataFrame or any other data structure that can be
-        indexed using column names
-        :param metric: The `metric` parameter is an instance of a metric class that is used to evaluate
-        the generated summaries. It should have methods such as `add_batch()` to add predictions and
-        references, and `compute()` to compute the metric score
-        :param model: The `model` parameter refers to the pre-trained model that will be used for
-        generating summaries. It should be an instance of a model class that has a `generate` method,
-        such as a BART or T5 model
-        :param tokenizer: The tokenizer is responsible for converting the input text into tokens that
-        can be understood by the model. It is used to tokenize the input text and generate input tensors
-        for the model
-        :param batch_size: The batch_size parameter determines the number of samples that will be
-        processed in each iteration. It is used to divide the dataset into smaller batches for efficient
-        processing, defaults to 16 (optional)
-        :param device: The "device" parameter specifies whether to use the GPU ("cuda") or CPU ("cpu")
-        for computation. If a GPU is available, it will be used by default
-        :param column_text: The name of the column in the dataset that contains the text data
-        (articles), defaults to article (optional)
-        :param column_summary: The `column_summary` parameter is used to specify the column name in the
-        dataset that contains the target summaries, defaults to highlights (optional)
-        :return: the computed ROUGE scores.
-        """
-
-        article_batches = list(self.generate_batch_sized_chunks(dataset[column_text], batch_size))
-        target_batches = list(self.generate_batch_sized_chunks(dataset[column_summary], batch_size))
-
-        for article_batch, target_batch in tqdm(
-            zip(article_batches, target_batches), total=len(article_batches)):
-            
-            inputs = tokenizer(article_batch, max_length=1024,  truncation=True, 
-                            padding="max_length", return_tensors="pt")
+        :param texts: The list of input texts
+        :param model: The seq2seq model used for generation
+        :param tokenizer: The tokenizer matching `model`
+        :param max_tokens_per_batch: The maximum number of input tokens, padding included, processed in
+        each iteration, defaults to 4096 (optional)
+        :param device: The device `model` is placed on, defaults to cuda when available (optional)
+        :param on_batch: A callable receiving the positions in `texts` and the summaries of every
+        finished batch, e.g. to persist them (optional)
+        :return: the generated summaries, in the same order as `texts`.
+        """
+        encodings = tokenizer(texts, max_length=1024, truncation=True)
+        batches = self.generate_token_budget_batches(encodings, tokenizer, max_tokens_per_batch)
+        predictions = [None] * len(texts)
+
+        for indices, inputs in tqdm(batches):
             
             summaries = model.generate(input_ids=inputs["input_ids"].to(device),
                             attention_mask=inputs["attention_mask"].to(device), 
                             length_penalty=0.8, num_beams=8, max_length=128)
             ''' parameter for length penalty ensures that the model does not generate sequences that are too long. '''
             
-            # Finally, we decode the generated texts, 
-            # replace the  token, and add the decoded texts with the references to the metric.
+            # Finally, we decode the generated texts and replace the <n> token.
             decoded_summaries = [tokenizer.decode(s, skip_special_tokens=True, 
                                     clean_up_tokenization_spaces=True) 
                 for s in summaries]      
             
-            decoded_summaries = [d.replace("", " ") for d in decoded_summaries]
-            
+            decoded_summaries = [d.replace("<n>", " ") for d in decoded_summaries]
             
-            metric.add_batch(predictions=decoded_summaries, references=target_batch)
-            
-        #  Finally compute and return the ROUGE scores.
-        score = metric.compute()
-        return score
+            for i, summary in zip(indices, decoded_summaries):
+                predictions[i] = summary
+
+            if on_batch is not None:
+                on_batch(indices, decoded_summaries)
+
+        return predictions
+
+    
+    def score_predictions(self, predictions, references):
+        """
+        The function `score_predictions` computes the ROUGE F-measures of already generated summaries
+        with the in-package scorer, which runs offline.
+
+        :param predictions: The generated summaries
+        :param references: The target summaries, in the same order as `predictions`
+        :return: a dictionary mapping each ROUGE variant (rouge1, rouge2, rougeL, rougeLsum) to its
+        mean F-measure.
+        """
+        return compute_rouge(predictions, references, num_proc=self.config.rouge_num_proc)
+
+
+    def score(self, model, tokenizer, dataset, device = "cuda" if torch.cuda.is_available() else "cpu"):
+        """
+        The function `score` computes the ROUGE F-measures of a model on a slice of the SAMSum dataset.
+
+        :param model: The seq2seq model to score
+        :param tokenizer: The tokenizer matching `model`
+        :param dataset: The slice of the tokenized SAMSum dataset to score on, with `dialogue` and
+        `summary` columns
+        :param device: The device `model` is placed on, defaults to cuda when available (optional)
+        :return: a dictionary mapping each ROUGE variant (rouge1, rouge2, rougeL, rougeLsum) to its
+        mean F-measure.
+        """
+        predictions = self.generate_summaries(dataset['dialogue'], model, tokenizer,
+                                              self.config.max_tokens_per_batch, device)
+
+        return self.score_predictions(predictions, dataset['summary'])
+
+
+    def prediction_store_fingerprint(self) -> str:
+        """
+        The function `prediction_store_fingerprint` identifies the model, tokenizer and dataset the
+        stored predictions were generated from.
+        :return: a hex digest that changes whenever one of those artifacts changes.
+        """
+        return get_directory_fingerprint(self.config.model_path, self.config.tokenizer_path, self.config.data_path)
+
+
+    def load_predictions(self):
+        """
+        The function `load_predictions` reads every prediction stored under `predictions_dir`. Stores
+        written for other artifacts are discarded, and a record cut short by a crash is truncated away
+        so appending can resume cleanly.
+        :return: a dictionary mapping test split indices to their stored records.
+        """
+        os.makedirs(self.config.predictions_dir, exist_ok=True)
+        run_file = os.path.join(self.config.predictions_dir, PREDICTIONS_RUN_FILE)
+        fingerprint = self.prediction_store_fingerprint()
+
+        stored_fingerprint = None
+        if os.path.exists(run_file):
+            with open(run_file) as f:
+                stored_fingerprint = json.load(f)["fingerprint"]
+
+        part_files = sorted(glob.glob(os.path.join(self.config.predictions_dir, "part-*.jsonl")))
+        if stored_fingerprint != fingerprint:
+            if part_files:
+                logger.info(f"Model or data changed, discarding stored predictions in {self.config.predictions_dir}")
+            for path in part_files:
+                os.remove(path)
+            with open(run_file, 'w') as f:
+                json.dump({"fingerprint": fingerprint}, f)
+            return {}
+
+        records = {}
+        for path in part_files:
+            with open(path, 'rb+') as f:
+                content = f.read()
+                complete = content[:content.rfind(b"\n") + 1]
+                if len(complete) != len(content):
+                    f.truncate(len(complete))
+            for line in complete.decode("utf-8").splitlines():
+                record = json.loads(line)
+                records[record["index"]] = record
+
+        return records
+
+
+    def generate_sharded(self, indices, texts, references):
+        """
+        The function `generate_sharded` splits the texts into `num_shards` interleaved shards and
+        summarizes every shard in its own worker process, each holding a model replica on the CPU with
+        `threads_per_worker` torch threads. Every worker appends its predictions to its own part file.
+
+        :param indices: The test split indices of the texts
+        :param texts: The list of input dialogues
+        :param references: The target summaries of the texts
+        """
+        num_shards = min(self.config.num_shards, len(texts))
+        num_threads = self.config.threads_per_worker or max(1, (os.cpu_count() or 1) // num_shards)
+        shards = [list(range(len(texts)))[k::num_shards] for k in range(num_shards)]
+        logger.info(f"Evaluating {len(texts)} dialogues in {num_shards} shards with {num_threads} thread(s) each")
+
+        # Spawned workers do not inherit the parent's torch thread pools or loaded weights.
+        with ProcessPoolExecutor(max_workers=num_shards, mp_context=multiprocessing.get_context("spawn")) as executor:
+            list(executor.map(evaluate_shard,
+                              [self.config] * num_shards,
+                              range(num_shards),
+                              [[indices[i] for i in shard] for shard in shards],
+                              [[texts[i] for i in shard] for shard in shards],
+                              [[references[i] for i in shard] for shard in shards],
+                              [num_threads] * num_shards))
+
+
+    def rescore(self, indices = None):
+        """
+        The function `rescore` computes the ROUGE scores from the stored predictions alone, without
+        running generation, and saves them to the metrics CSV file.
+
+        :param indices: The test split indices to score, defaults to every stored prediction (optional)
+        :return: a dictionary mapping each ROUGE variant to its mean F-measure.
+        """
+        records = self.load_predictions()
+        if indices is None:
+            indices = sorted(records)
+
+        missing = [i for i in indices if i not in records]
+        if missing:
+            raise ValueError(f"No stored prediction for {len(missing)} test dialogue(s), run evaluate() first")
+
+        rouge_dict = self.score_predictions([records[i]["prediction"] for i in indices],
+                                            [records[i]["reference"] for i in indices])
+
+        df = pd.DataFrame(rouge_dict, index = ['pegasus'] )
+        df.to_csv(self.config.metric_file_name, index=False)
+        return rouge_dict
 
 
     def evaluate(self):
         """
         The function evaluates the performance of a Pegasus model on a test dataset using the ROUGE
-        metric and saves the results to a CSV file.
+        metric and saves the results to a CSV file. Predictions are appended to `predictions_dir` as
+        they are generated, so a restarted evaluation only generates the dialogues that are missing.
+        :return: a dictionary mapping each ROUGE variant to its mean F-measure.
         """
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
-        model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.config.model_path).to(device)
-       
-        #loading data 
         dataset_samsum_pt = load_from_disk(self.config.data_path)
+        test = dataset_samsum_pt['test']
+        if self.config.num_samples:
+            test = test.select(range(min(self.config.num_samples, len(test))))
 
+        records = self.load_predictions()
+        pending = [i for i in range(len(test)) if i not in records]
+        logger.info(f"{len(test) - len(pending)} of {len(test)} predictions already stored")
 
-        rouge_names = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
-  
-        rouge_metric = load_metric('rouge')
+        if pending:
+            subset = test.select(pending)
+            if self.config.num_shards > 1:
+                self.generate_sharded(pending, subset['dialogue'], subset['summary'])
+            else:
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
+                model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.config.model_path).to(device)
+                model_pegasus.eval()
+                writer = PredictionWriter(self.config.predictions_dir, 0, pending, subset['summary'])
+                with torch.inference_mode():
+                    self.generate_summaries(subset['dialogue'], model_pegasus, tokenizer,
+                                            self.config.max_tokens_per_batch, device, on_batch=writer.write)
 
-        score = self.calculate_metric_on_test_ds(
-        dataset_samsum_pt['test'][0:10], rouge_metric, model_pegasus, tokenizer, batch_size = 2, column_text = 'dialogue', column_summary= 'summary'
-            )
+        return self.rescore(list(range(len(test))))
 
-        rouge_dict = dict((rn, score[rn].mid.fmeasure ) for rn in rouge_names )
 
-        df = pd.DataFrame(rouge_dict, index = ['pegasus'] )
-        df.to_csv(self.config.metric_file_name, index=False)
\ No newline at end of file
+# The PredictionWriter class appends the predictions of one evaluation worker to its own JSONL part
+# file, one record per dialogue, flushing after every batch so finished batches survive a crash.
+class PredictionWriter:
+    def __init__(self, predictions_dir, part: int, indices, references):
+        """
+        :param predictions_dir: The directory holding the part files
+        :param part: The number of the part file to append to
+        :param indices: The test split indices of the texts being generated
+        :param references: The target summaries, in the same order as `indices`
+        """
+        self.path = os.path.join(predictions_dir, f"part-{part:05d}.jsonl")
+        self.indices = indices
+        self.references = references
+
+
+    def write(self, positions, summaries):
+        """
+        The function `write` appends one generated batch.
+
+        :param positions: The positions of the batch members in the generated texts
+        :param summaries: The generated summaries, in the same order as `positions`
+        """
+        with open(self.path, 'a', encoding="utf-8") as f:
+            for position, summary in zip(positions, summaries):
+                f.write(json.dumps({"index": self.indices[position],
+                                    "prediction": summary,
+                                    "reference": self.references[position]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def evaluate_shard(config: ModelEvaluationConfig, part: int, indices, texts, references, num_threads: int):
+    """
+    The function `evaluate_shard` is the picklable entry point of a sharded evaluation worker. It loads
+    its own model replica on the CPU, summarizes one shard of the test split and appends the
+    predictions to its part file.
+
+    :param config: The evaluation configuration
+    :param part: The number of the worker's part file
+    :param indices: The test split indices of the shard
+    :param texts: The dialogues of the shard
+    :param references: The target summaries of the shard
+    :param num_threads: The number of intra-op threads torch may use in this worker
+    """
+    torch.set_num_threads(num_threads)
+    tokenizer = AutoTokenizer.from_pretrained(config.tokenizer_path)
+    model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(config.model_path)
+    model_pegasus.eval()
+    writer = PredictionWriter(config.predictions_dir, part, indices, references)
+
+    with torch.inference_mode():
+        ModelEvaluation(config).generate_summaries(texts, model_pegasus, tokenizer, config.max_tokens_per_batch,
+                                                   device="cpu", on_batch=writer.write)
@@ -0,0 +1,107 @@
+import os
+import shutil
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+import torch
+from textSummarizer.entity import ModelExportConfig
+from textSummarizer.logging import logger
+
+
+ONNX_ENCODER_FILE = "encoder_model.onnx"
+
+
+def is_onnx_model(model_path) -> bool:
+    """
+    The function `is_onnx_model` tells whether a model directory holds an ONNX export.
+
+    :param model_path: The model directory
+    :return: True if the directory contains exported ONNX graphs, False otherwise.
+    """
+    return os.path.exists(os.path.join(model_path, ONNX_ENCODER_FILE))
+
+
+def load_onnx_model(model_path):
+    """
+    The function `load_onnx_model` loads an exported encoder-decoder for ONNX Runtime. The returned
+    model supports `generate`, including beam search, on top of the exported graphs.
+
+    :param model_path: The directory written by `ModelExport.export`
+    :return: an `ORTModelForSeq2SeqLM` running on the CPU execution provider.
+    """
+    # optimum is only needed by deployments that serve the ONNX backend.
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    return ORTModelForSeq2SeqLM.from_pretrained(model_path, use_cache=True)
+
+
+# The ModelExport class exports the trained Pegasus encoder and decoder (with past key/values) to ONNX
+# and checks that the exported graphs generate the same summaries as the PyTorch model.
+class ModelExport:
+    def __init__(self, config: ModelExportConfig):
+        self.config = config
+
+
+    def export(self) -> bool:
+        """
+        The function `export` writes the encoder, decoder and decoder-with-past ONNX graphs and the
+        tokenizer to `onnx_model_path`, then runs the parity check. An export that fails the check is
+        removed again so it can never be served.
+        :return: True if the export passed the parity check, False otherwise.
+        """
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        if os.path.exists(self.config.onnx_model_path):
+            shutil.rmtree(self.config.onnx_model_path)
+
+        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
+        ort_model = ORTModelForSeq2SeqLM.from_pretrained(self.config.model_path, export=True, use_cache=True)
+        ort_model.save_pretrained(self.config.onnx_model_path)
+        tokenizer.save_pretrained(self.config.onnx_model_path)
+        logger.info(f"Exported ONNX graphs to {self.config.onnx_model_path}")
+
+        exact_match = self.check_parity(tokenizer)
+        if exact_match < self.config.min_exact_match:
+            logger.warning(f"ONNX export rejected, only {exact_match:.2%} of summaries match the PyTorch model")
+            shutil.rmtree(self.config.onnx_model_path)
+            return False
+
+        logger.info(f"ONNX export matches the PyTorch model on {exact_match:.2%} of summaries")
+        return True
+
+
+    def check_parity(self, tokenizer) -> float:
+        """
+        The function `check_parity` summarizes the first `parity_samples` dialogues of the SAMSum test
+        split with both the PyTorch model and the exported graphs, using the serving generation
+        parameters, and writes the side-by-side outputs to `parity_file`.
+
+        :param tokenizer: The tokenizer shared by both models
+        :return: the fraction of dialogues for which both models produced the same summary.
+        """
+        # The evaluation stack is only needed by this stage, not by servers loading the export.
+        from datasets import load_from_disk
+        import pandas as pd
+        from tqdm import tqdm
+
+        model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.config.model_path)
+        model_pegasus.eval()
+        onnx_model = load_onnx_model(self.config.onnx_model_path)
+
+        dataset_samsum_pt = load_from_disk(self.config.data_path)
+        dialogues = dataset_samsum_pt['test'][0:self.config.parity_samples]['dialogue']
+
+        rows = []
+        for dialogue in tqdm(dialogues):
+            inputs = tokenizer([dialogue], max_length=1024, truncation=True, return_tensors="pt")
+            summaries = []
+            for model in (model_pegasus, onnx_model):
+                with torch.inference_mode():
+                    output = model.generate(input_ids=inputs["input_ids"],
+                                            attention_mask=inputs["attention_mask"],
+                                            **self.config.gen_kwargs)
+                summaries.append(tokenizer.decode(output[0], skip_special_tokens=True,
+                                                  clean_up_tokenization_spaces=True))
+            rows.append({"pytorch": summaries[0], "onnx": summaries[1], "match": summaries[0] == summaries[1]})
+
+        df = pd.DataFrame(rows)
+        df.to_csv(self.config.parity_file, index=False)
+        return float(df["match"].mean()) if len(df) else 1.0
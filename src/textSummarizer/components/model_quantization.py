@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+from transformers import AutoConfig, AutoModelForSeq2SeqLM, AutoTokenizer
+import torch
+from textSummarizer.entity import ModelQuantizationConfig, ModelEvaluationConfig
+from textSummarizer.logging import logger
+
+
+QUANTIZATION_FILE = "quantization.json"
+INT8_WEIGHTS_FILE = "int8_weights.pt"
+
+
+def quantize_model(model, dtype: str):
+    """
+    The function `quantize_model` converts an fp32 seq2seq model for CPU inference.
+
+    :param model: The fp32 model to convert. It is modified in place for bfloat16
+    :param dtype: "int8" for dynamic int8 quantization of every `nn.Linear` layer, or "bfloat16" to
+    cast all weights to bfloat16
+    :return: the converted model.
+    """
+    if dtype == "int8":
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if dtype == "bfloat16":
+        return model.to(torch.bfloat16)
+    raise ValueError(f"Unknown quantization dtype: {dtype}")
+
+
+def int8_to_plain_tensors(state_dict) -> dict:
+    """
+    The function `int8_to_plain_tensors` converts the state dict of a dynamic int8 model into plain
+    tensors, so it can be saved without pickling quantized tensors or packed parameter objects and be
+    loaded with `torch.load(..., weights_only=True)`.
+
+    :param state_dict: The state dict of a model converted by `quantize_model` with "int8"
+    :return: a dictionary of plain tensors, where the packed (weight, bias) of every quantized linear
+    layer is stored as its int8 values, weight scale, weight zero point and bias.
+    """
+    tensors = {}
+    for key, value in state_dict.items():
+        if isinstance(value, tuple):
+            weight, bias = value
+            tensors[f"{key}.weight"] = weight.int_repr()
+            tensors[f"{key}.weight_scale"] = torch.tensor(weight.q_scale(), dtype=torch.float64)
+            tensors[f"{key}.weight_zero_point"] = torch.tensor(weight.q_zero_point(), dtype=torch.int64)
+            if bias is not None:
+                tensors[f"{key}.bias"] = bias.detach()
+        elif isinstance(value, torch.Tensor):
+            tensors[key] = value
+        # The packed parameter dtypes are set again by `quantize_model` when loading.
+    return tensors
+
+
+def int8_from_plain_tensors(tensors: dict, state_dict) -> dict:
+    """
+    The function `int8_from_plain_tensors` reverses `int8_to_plain_tensors`.
+
+    :param tensors: The plain tensors written by `int8_to_plain_tensors`
+    :param state_dict: The state dict of a freshly quantized model with the same architecture
+    :return: a state dict that can be passed to `load_state_dict`.
+    """
+    for key, value in state_dict.items():
+        if isinstance(value, tuple):
+            weight = torch._make_per_tensor_quantized_tensor(tensors[f"{key}.weight"],
+                                                             tensors[f"{key}.weight_scale"].item(),
+                                                             tensors[f"{key}.weight_zero_point"].item())
+            state_dict[key] = (weight, tensors.get(f"{key}.bias"))
+        elif isinstance(value, torch.Tensor):
+            state_dict[key] = tensors[key]
+    return state_dict
+
+
+def is_quantized_model(model_path) -> bool:
+    """
+    The function `is_quantized_model` tells whether a model directory was written by `ModelQuantization`.
+
+    :param model_path: The model directory
+    :return: True if the directory holds a quantized model, False otherwise.
+    """
+    return os.path.exists(os.path.join(model_path, QUANTIZATION_FILE))
+
+
+def load_quantized_model(model_path):
+    """
+    The function `load_quantized_model` loads a model saved by `ModelQuantization`. Dynamic int8
+    models cannot go through `from_pretrained`, so the architecture is rebuilt from its config,
+    quantized the same way and filled with the saved quantized weights.
+
+    :param model_path: The quantized model directory
+    :return: the loaded model, in eval mode on the CPU.
+    """
+    with open(os.path.join(model_path, QUANTIZATION_FILE)) as f:
+        dtype = json.load(f)["dtype"]
+
+    if dtype == "bfloat16":
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_path, torch_dtype=torch.bfloat16)
+    else:
+        model = quantize_model(AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(model_path)), dtype)
+        tensors = torch.load(os.path.join(model_path, INT8_WEIGHTS_FILE), map_location="cpu", weights_only=True)
+        model.load_state_dict(int8_from_plain_tensors(tensors, model.state_dict()))
+
+    model.eval()
+    return model
+
+
+# The ModelQuantization class produces a quantized copy of the trained model and publishes it only if
+# its ROUGE scores stay within tolerance of the fp32 model.
+class ModelQuantization:
+    def __init__(self, config: ModelQuantizationConfig, evaluation_config: ModelEvaluationConfig):
+        # The evaluation stack is only needed by this stage, not by servers loading quantized models.
+        from textSummarizer.components.model_evaluation import ModelEvaluation
+
+        self.config = config
+        self.evaluation = ModelEvaluation(config=evaluation_config)
+
+
+    def quantize(self) -> bool:
+        """
+        The function `quantize` quantizes the trained model, scores both models with the ROUGE
+        computation of `ModelEvaluation`, writes a comparison report and saves the quantized model to
+        `quantized_model_path` only when no ROUGE score dropped by more than `rouge_tolerance`. A rejected
+        model leaves `quantized_model_path` empty.
+        :return: True if the quantized model was published, False if it was rejected.
+        """
+        from datasets import load_from_disk
+        import pandas as pd
+
+        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
+        dataset_samsum_pt = load_from_disk(self.config.data_path)
+        test_ds = dataset_samsum_pt['test'][0:self.config.num_samples]
+
+        # Quantized kernels run on the CPU, so score both models there for a fair comparison.
+        model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.config.model_path)
+        model_pegasus.eval()
+        baseline = self.evaluation.score(model_pegasus, tokenizer, test_ds, device="cpu")
+
+        quantized_model = quantize_model(model_pegasus, self.config.dtype)
+        quantized = self.evaluation.score(quantized_model, tokenizer, test_ds, device="cpu")
+
+        drops = {rn: baseline[rn] - quantized[rn] for rn in baseline}
+        published = max(drops.values()) <= self.config.rouge_tolerance
+
+        df = pd.DataFrame([baseline, quantized, drops], index=['fp32', self.config.dtype, 'drop'])
+        df['published'] = published
+        df.to_csv(self.config.report_file)
+
+        if os.path.exists(self.config.quantized_model_path):
+            shutil.rmtree(self.config.quantized_model_path)
+        # The model directory is a stage output, so it exists, empty, even when the model is rejected.
+        os.makedirs(self.config.quantized_model_path)
+
+        if not published:
+            logger.warning(f"Quantized model rejected, ROUGE drops {drops} exceed tolerance {self.config.rouge_tolerance}")
+            return False
+
+        self.save(quantized_model, tokenizer)
+        logger.info(f"Quantized model published to {self.config.quantized_model_path}, ROUGE drops {drops}")
+        return True
+
+
+    def save(self, model, tokenizer):
+        """
+        The function `save` writes the quantized model, its tokenizer and a marker file recording the
+        quantization dtype to `quantized_model_path`.
+
+        :param model: The quantized model
+        :param tokenizer: The tokenizer to save alongside it
+        """
+        path = self.config.quantized_model_path
+        os.makedirs(path, exist_ok=True)
+
+        if self.config.dtype == "int8":
+            model.config.save_pretrained(path)
+            torch.save(int8_to_plain_tensors(model.state_dict()), os.path.join(path, INT8_WEIGHTS_FILE))
+        else:
+            model.save_pretrained(path)
+
+        tokenizer.save_pretrained(path)
+        with open(os.path.join(path, QUANTIZATION_FILE), 'w') as f:
+            json.dump({"dtype": self.config.dtype, "source_model": str(self.config.model_path)}, f)
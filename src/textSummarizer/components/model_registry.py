@@ -0,0 +1,204 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+from textSummarizer.components.adapters import AdapterSet
+from textSummarizer.entity import PredictionConfig
+from textSummarizer.logging import logger
+
+# torch and transformers are imported on first use, so the serving app starts listening before they
+# are loaded and a process pool parent that only tokenizes never loads torch.
+if TYPE_CHECKING:
+    from textSummarizer.components.encoder_cache import EncoderOutputCache
+
+
+@dataclass
+# The `ModelHandle` class bundles an already-loaded model and its tokenizer so they can be shared
+# across requests.
+class ModelHandle:
+    model: Any
+    tokenizer: Any
+    device: str
+    torch_dtype: str
+    load_seconds: float
+    encoder_cache: Optional["EncoderOutputCache"] = None
+    adapters: Optional[AdapterSet] = None
+
+
+# The ModelRegistry class keeps one loaded model per (model_path, tokenizer_path, device, dtype) for
+# the lifetime of the process.
+class ModelRegistry:
+    def __init__(self):
+        self._handles = {}
+        self._tokenizers = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+
+    def resolve_device(self, device: str) -> str:
+        """
+        The function `resolve_device` maps the configured device name to a concrete torch device.
+
+        :param device: The configured device, either "auto" or an explicit torch device such as "cpu"
+        or "cuda"
+        :return: "cuda" if `device` is "auto" and a GPU is available, "cpu" for "auto" otherwise, and
+        `device` unchanged in every other case.
+        """
+        if device == "auto":
+            import torch
+            return "cuda" if torch.cuda.is_available() else "cpu"
+        return device
+
+
+    def get(self, model_path, tokenizer_path, device = "cpu", torch_dtype = "float32",
+            encoder_cache_bytes = 0, adapter_dir = None, max_loaded_adapters = 0,
+            mmap_weights = False) -> ModelHandle:
+        """
+        The function `get` returns the shared handle for the given model artifacts, loading them on
+        first use. Concurrent callers asking for the same key wait for a single load instead of each
+        loading their own copy.
+
+        :param model_path: The directory containing the saved seq2seq model
+        :param tokenizer_path: The directory containing the saved tokenizer
+        :param device: The torch device the model is placed on, defaults to cpu (optional)
+        :param torch_dtype: The name of the torch dtype the weights are loaded in, defaults to float32
+        (optional)
+        :param encoder_cache_bytes: The memory budget of the handle's encoder-output cache when it is
+        first loaded, 0 disables the cache, defaults to 0 (optional)
+        :param adapter_dir: The directory of the LoRA adapters that can be applied to the model
+        (optional)
+        :param max_loaded_adapters: The number of adapters the handle keeps in memory when it is first
+        loaded, 0 disables adapters, defaults to 0 (optional)
+        :param mmap_weights: Memory-map safetensors weights on the CPU so that every process serving the
+        same model shares one copy of them, defaults to False (optional)
+        :return: a `ModelHandle` holding the loaded model and tokenizer.
+        """
+        key = (str(model_path), str(tokenizer_path), self.resolve_device(device), torch_dtype)
+
+        handle = self._handles.get(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = self._load(*key, encoder_cache_bytes, adapter_dir, max_loaded_adapters, mmap_weights)
+                self._handles[key] = handle
+
+        return handle
+
+
+    def get_tokenizer(self, tokenizer_path):
+        """
+        The function `get_tokenizer` returns the shared tokenizer saved at `tokenizer_path`, loading it
+        on first use. It lets a process that does not run the model (e.g. the parent of a process
+        pool) tokenize without loading any weights.
+
+        :param tokenizer_path: The directory containing the saved tokenizer
+        :return: the loaded tokenizer.
+        """
+        key = str(tokenizer_path)
+        tokenizer = self._tokenizers.get(key)
+        if tokenizer is None:
+            with self._lock:
+                tokenizer = self._tokenizers.get(key)
+                if tokenizer is None:
+                    from transformers import AutoTokenizer
+                    tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+                    self._tokenizers[key] = tokenizer
+        return tokenizer
+
+
+    def get_for_config(self, config: PredictionConfig) -> ModelHandle:
+        """
+        The function `get_for_config` returns the shared handle for the model described by a
+        `PredictionConfig`.
+
+        :param config: The prediction configuration naming the model, tokenizer, device and dtype
+        :return: the `ModelHandle` for that configuration.
+        """
+        return self.get(config.model_path, config.tokenizer_path, config.device, config.torch_dtype,
+                        config.encoder_cache_bytes, config.adapter_dir, config.max_loaded_adapters,
+                        config.mmap_weights)
+
+
+    def _load(self, model_path, tokenizer_path, device, torch_dtype, encoder_cache_bytes,
+              adapter_dir, max_loaded_adapters, mmap_weights) -> ModelHandle:
+        import torch
+        from transformers import AutoModelForSeq2SeqLM
+        from textSummarizer.components.encoder_cache import EncoderOutputCache
+        from textSummarizer.components.model_export import is_onnx_model, load_onnx_model
+        from textSummarizer.components.model_quantization import is_quantized_model, load_quantized_model
+        from textSummarizer.components.weight_loading import get_safetensors_files, load_mmap_model
+
+        logger.info(f"Loading model {model_path} on {device} ({torch_dtype})")
+        start = time.perf_counter()
+
+        tokenizer = self.get_tokenizer(tokenizer_path)
+        if is_quantized_model(model_path):
+            # Quantized artifacts carry their own dtype and only have CPU kernels.
+            model = load_quantized_model(model_path)
+            device = "cpu"
+        elif is_onnx_model(model_path):
+            model = load_onnx_model(model_path)
+            device = "cpu"
+        elif mmap_weights and device == "cpu" and get_safetensors_files(model_path):
+            model = load_mmap_model(model_path, torch_dtype)
+        else:
+            model = AutoModelForSeq2SeqLM.from_pretrained(
+                model_path, torch_dtype=getattr(torch, torch_dtype)
+            ).to(device)
+            model.eval()
+
+        load_seconds = time.perf_counter() - start
+        logger.info(f"Model {model_path} loaded in {load_seconds:.2f}s")
+
+        # Only PyTorch models expose their encoder separately; ONNX graphs always run it in generate.
+        encoder_cache = None
+        if encoder_cache_bytes and isinstance(model, torch.nn.Module):
+            encoder_cache = EncoderOutputCache(encoder_cache_bytes)
+
+        # Adapters are trained on the full-precision PyTorch base model.
+        adapters = None
+        if max_loaded_adapters and not is_quantized_model(model_path) and isinstance(model, torch.nn.Module):
+            adapters = AdapterSet(model, adapter_dir, max_loaded_adapters)
+
+        return ModelHandle(model=model, tokenizer=tokenizer, device=device,
+                           torch_dtype=torch_dtype, load_seconds=load_seconds,
+                           encoder_cache=encoder_cache, adapters=adapters)
+
+
+    def warmup(self, config: PredictionConfig) -> ModelHandle:
+        """
+        The function `warmup` loads the configured model and runs one short generation so that lazy
+        initialisation happens before the first user request, then marks the registry as ready.
+
+        :param config: The prediction configuration of the model to warm up
+        :return: the warmed-up `ModelHandle`.
+        """
+        import torch
+
+        handle = self.get_for_config(config)
+        inputs = handle.tokenizer(["Warmup dialogue."], return_tensors="pt").to(handle.device)
+        with torch.inference_mode():
+            handle.model.generate(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                                  max_length=8, num_beams=1)
+        self._ready.set()
+        logger.info("Model warmup finished, ready to serve")
+        return handle
+
+
+    def is_ready(self) -> bool:
+        """
+        The function `is_ready` reports whether `warmup` has completed.
+        :return: True once a model has been warmed up, False otherwise.
+        """
+        return self._ready.is_set()
+
+
+# Process-wide registry shared by the serving app and every PredictionPipeline.
+model_registry = ModelRegistry()
@@ -1,53 +1,355 @@
-from transformers import TrainingArguments, Trainer
+from transformers import TrainingArguments, Trainer, TrainerCallback
 from transformers import DataCollatorForSeq2Seq
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 from datasets import load_dataset, load_from_disk
-from textSummarizer.entity import ModelTrainerConfig
+from textSummarizer.entity import ModelTrainerConfig, TrainingBenchmarkConfig
+from textSummarizer.logging import logger
+from textSummarizer.utils.common import length_grouped_batches
+from torch.utils.data import DataLoader, Sampler
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow.compute as pc
+import dataclasses
+import json
+import multiprocessing
+import random
+import resource
+import time
 import torch
 import os
 
 
+MODEL_INPUT_COLUMNS = ["input_ids", "attention_mask", "labels"]
+
+
+# The TokenBudgetBatchSampler class yields batches of dataset indices grouped by length, each holding
+# at most `max_tokens` padded input tokens, so short dialogues train in large batches and long ones in
+# small batches. The batch order is reshuffled every epoch.
+class TokenBudgetBatchSampler(Sampler):
+    def __init__(self, lengths, max_tokens: int, shuffle: bool = True, seed: int = 42):
+        """
+        :param lengths: The input length of every example
+        :param max_tokens: The maximum number of padded input tokens in a batch
+        :param shuffle: Shuffle the batch order every epoch, defaults to True (optional)
+        :param seed: The seed of the shuffling, defaults to 42 (optional)
+        """
+        self.batches = length_grouped_batches(list(lengths), max_tokens=max_tokens)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+
+    def __iter__(self):
+        order = list(range(len(self.batches)))
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(order)
+            self.epoch += 1
+        for i in order:
+            yield self.batches[i]
+
+
+    def __len__(self):
+        return len(self.batches)
+
+
+# The TokenBudgetCollator class pads a batch of NumPy rows read from the Arrow dataset. Every field is
+# allocated once at its final padded shape and filled in place, instead of converting rows to Python
+# lists and padding them through the tokenizer as `DataCollatorForSeq2Seq` does.
+class TokenBudgetCollator:
+    def __init__(self, pad_token_id: int, label_pad_token_id: int = -100):
+        """
+        :param pad_token_id: The padding token of the inputs
+        :param label_pad_token_id: The padding value of the labels, ignored by the loss, defaults to -100
+        (optional)
+        """
+        self.pad_values = {"input_ids": pad_token_id, "attention_mask": 0, "labels": label_pad_token_id}
+
+
+    def __call__(self, examples):
+        """
+        :param examples: The examples of the batch, each a dictionary mapping the model input columns to
+        NumPy arrays
+        :return: a dictionary of padded int64 tensors.
+        """
+        features = {}
+        for name in examples[0]:
+            length = max(len(example[name]) for example in examples)
+            padded = torch.full((len(examples), length), self.pad_values[name], dtype=torch.long)
+            for i, example in enumerate(examples):
+                row = example[name]
+                padded[i, :len(row)] = torch.from_numpy(row)
+            features[name] = padded
+        return features
+
+
+# The ThroughputCallback class logs the number of real (non-padding) input and label tokens processed
+# per second in every optimizer step, and keeps the per-step measurements for benchmarking.
+class ThroughputCallback(TrainerCallback):
+    def __init__(self):
+        self.tokens = 0
+        self.examples = 0
+        self.started = None
+        self.steps = []
+
+
+    def add_tokens(self, count: int, examples: int = 0):
+        self.tokens += count
+        self.examples += examples
+
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self.tokens = 0
+        self.examples = 0
+        self.started = time.perf_counter()
+
+
+    def on_step_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self.started
+        tokens_per_second = self.tokens / elapsed if elapsed > 0 else 0.0
+        self.steps.append({"tokens": self.tokens, "examples": self.examples, "seconds": elapsed})
+        state.log_history.append({"step": state.global_step, "train_tokens_per_second": tokens_per_second})
+        logger.info(f"Step {state.global_step}: {self.tokens} tokens in {elapsed:.2f}s ({tokens_per_second:.0f} tokens/s)")
+
+
+# The TokenBudgetTrainer class is a `Trainer` that reports training throughput and, when
+# `max_tokens_per_batch` is set, reads length-grouped token-budget batches straight from the
+# memory-mapped Arrow dataset instead of fixed-size batches.
+class TokenBudgetTrainer(Trainer):
+    def __init__(self, *args, max_tokens_per_batch: int, throughput: ThroughputCallback, **kwargs):
+        """
+        :param max_tokens_per_batch: The maximum number of padded input tokens in a batch, 0 keeps the
+        fixed `per_device_train_batch_size` batches
+        :param throughput: The callback counting processed tokens, also passed in `callbacks`
+        """
+        super().__init__(*args, **kwargs)
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.throughput = throughput
+
+
+    def token_budget_dataloader(self, dataset, shuffle: bool):
+        """
+        The function `token_budget_dataloader` builds a dataloader over token-budget batches. Example
+        lengths are read from the Arrow list offsets without materializing any token, and each batch is
+        fetched with a single indexed read of the dataset, as NumPy arrays.
+
+        :param dataset: The tokenized split
+        :param shuffle: Shuffle the batch order every epoch
+        :return: the dataloader, prepared for the trainer's accelerator.
+        """
+        dataset = dataset.select_columns(MODEL_INPUT_COLUMNS)
+        lengths = pc.list_value_length(dataset.with_format("arrow")["input_ids"]).to_numpy()
+        dataset = dataset.with_format("numpy")
+
+        sampler = TokenBudgetBatchSampler(lengths, self.max_tokens_per_batch, shuffle=shuffle, seed=self.args.seed)
+        # `datasets.Dataset.__getitems__` serves each batch of indices with one read, not one per example.
+        dataloader = DataLoader(dataset, batch_sampler=sampler,
+                                collate_fn=self.data_collator,
+                                num_workers=self.args.dataloader_num_workers,
+                                pin_memory=self.args.dataloader_pin_memory)
+        return self.accelerator.prepare(dataloader)
+
+
+    def get_train_dataloader(self):
+        if not self.max_tokens_per_batch:
+            return super().get_train_dataloader()
+        return self.token_budget_dataloader(self.train_dataset, shuffle=True)
+
+
+    def get_eval_dataloader(self, eval_dataset = None):
+        if not self.max_tokens_per_batch:
+            return super().get_eval_dataloader(eval_dataset)
+        return self.token_budget_dataloader(eval_dataset if eval_dataset is not None else self.eval_dataset, shuffle=False)
+
+
+    def training_step(self, model, inputs, *args, **kwargs):
+        self.throughput.add_tokens(int(inputs["attention_mask"].sum()) + int((inputs["labels"] != -100).sum()),
+                                   examples=len(inputs["input_ids"]))
+        return super().training_step(model, inputs, *args, **kwargs)
+
+
 class ModelTrainer:
     def __init__(self, config: ModelTrainerConfig):
         self.config = config
 
 
-    
-    def train(self, fine_tuning = False):
+    def build_trainer(self, max_steps: int = -1, output_dir = None, evaluate: bool = True):
+        """
+        The function `build_trainer` loads the checkpoint, tokenizer and tokenized dataset and builds a
+        trainer whose arguments all come from the `TrainingArguments` section of params.yaml.
+
+        :param max_steps: Stop after this many optimizer steps, -1 trains for `num_train_epochs`
+        (optional)
+        :param output_dir: The directory for checkpoints and logs, defaults to `root_dir` (optional)
+        :param evaluate: Evaluate on the validation split every `eval_steps`, defaults to True
+        (optional)
+        :return: a (trainer, model, tokenizer, throughput callback) tuple.
+        """
         device = "cuda" if torch.cuda.is_available() else "cpu"
         tokenizer = AutoTokenizer.from_pretrained(self.config.model_ckpt)
-        model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.config.model_ckpt).to(device)
+        model_pegasus = AutoModelForSeq2SeqLM.from_pretrained(self.base_model_path()).to(device)
+        if self.config.lora_enabled:
+            model_pegasus = self.add_lora_adapter(model_pegasus)
         seq2seq_data_collator = DataCollatorForSeq2Seq(tokenizer, model=model_pegasus)
         
-        #loading data 
-        dataset_samsum_pt = load_from_disk(self.config.data_path)
-
-        # trainer_args = TrainingArguments(
-        #     output_dir=self.config.root_dir, num_train_epochs=self.config.num_train_epochs, warmup_steps=self.config.warmup_steps,
-        #     per_device_train_batch_size=self.config.per_device_train_batch_size, per_device_eval_batch_size=self.config.per_device_train_batch_size,
-        #     weight_decay=self.config.weight_decay, logging_steps=self.config.logging_steps,
-        #     evaluation_strategy=self.config.evaluation_strategy, eval_steps=self.config.eval_steps, save_steps=1e6,
-        #     gradient_accumulation_steps=self.config.gradient_accumulation_steps
-        # ) 
-
+        #loading data, memory-mapped from the Arrow files rather than copied into RAM
+        dataset_samsum_pt = load_from_disk(self.config.data_path, keep_in_memory=False)
 
         trainer_args = TrainingArguments(
-            output_dir=self.config.root_dir, num_train_epochs=1, warmup_steps=500,
-            per_device_train_batch_size=1, per_device_eval_batch_size=1,
-            weight_decay=0.01, logging_steps=10,
-            evaluation_strategy='steps', eval_steps=500, save_steps=1e6,
-            gradient_accumulation_steps=16
+            output_dir=output_dir or self.config.root_dir, num_train_epochs=self.config.num_train_epochs, warmup_steps=self.config.warmup_steps,
+            per_device_train_batch_size=self.config.per_device_train_batch_size, per_device_eval_batch_size=self.config.per_device_train_batch_size,
+            weight_decay=self.config.weight_decay, logging_steps=self.config.logging_steps,
+            eval_strategy=self.config.evaluation_strategy if evaluate else "no", eval_steps=self.config.eval_steps, save_steps=self.config.save_steps,
+            gradient_accumulation_steps=self.config.gradient_accumulation_steps,
+            max_steps=max_steps, report_to="none",
+            dataloader_num_workers=self.config.dataloader_num_workers,
+            gradient_checkpointing=self.config.gradient_checkpointing,
+            bf16=self.config.bf16, torch_compile=self.config.torch_compile
         ) 
 
-        trainer = Trainer(model=model_pegasus, args=trainer_args,
+        if self.config.max_tokens_per_batch:
+            seq2seq_data_collator = TokenBudgetCollator(tokenizer.pad_token_id)
+
+        throughput = ThroughputCallback()
+        trainer = TokenBudgetTrainer(model=model_pegasus, args=trainer_args,
                   tokenizer=tokenizer, data_collator=seq2seq_data_collator,
                   train_dataset=dataset_samsum_pt["train"], 
-                  eval_dataset=dataset_samsum_pt["validation"])
+                  eval_dataset=dataset_samsum_pt["validation"],
+                  callbacks=[throughput], max_tokens_per_batch=self.config.max_tokens_per_batch,
+                  throughput=throughput)
+
+        return trainer, model_pegasus, tokenizer, throughput
+
+
+    def base_model_path(self):
+        """
+        The function `base_model_path` returns the checkpoint training starts from. LoRA adapters are
+        trained on top of the shared base model in `root_dir` once it exists, because that is the
+        model they are applied to when serving.
+        :return: the path or hub name of the checkpoint to load.
+        """
+        base_model_path = os.path.join(self.config.root_dir, "pegasus-samsum-model")
+        if self.config.lora_enabled and os.path.exists(base_model_path):
+            return base_model_path
+        return self.config.model_ckpt
+
+
+    def add_lora_adapter(self, model):
+        """
+        The function `add_lora_adapter` freezes the model and injects trainable low-rank adapters into
+        the `lora_target_modules` layers.
+
+        :param model: The loaded seq2seq model
+        :return: a `PeftModel` wrapping `model` in which only the adapter weights are trainable.
+        """
+        # peft is only needed to train or serve adapters.
+        from peft import LoraConfig, TaskType, get_peft_model
+
+        if self.config.gradient_checkpointing:
+            # The frozen embeddings would otherwise cut the gradient path through checkpointed layers.
+            model.enable_input_require_grads()
+
+        model = get_peft_model(model, LoraConfig(
+            task_type=TaskType.SEQ_2_SEQ_LM, r=self.config.lora_r, lora_alpha=self.config.lora_alpha,
+            lora_dropout=self.config.lora_dropout, target_modules=self.config.lora_target_modules
+        ))
+        trainable, total = model.get_nb_trainable_parameters()
+        logger.info(f"Training LoRA adapter {self.config.adapter_name}: {trainable} of {total} parameters trainable")
+        return model
+
+
+    def train(self, fine_tuning = None):
+        """
+        The function `train` fine-tunes the model on the transformed SAMSum dataset and saves it, or
+        only its LoRA adapter, together with the tokenizer.
+
+        :param fine_tuning: Whether to run the training loop before saving, defaults to
+        `TrainingArguments.fine_tuning` of params.yaml (optional)
+        """
+        if fine_tuning is None:
+            fine_tuning = self.config.fine_tuning
+        base_model_path = os.path.join(self.config.root_dir,"pegasus-samsum-model")
+        if self.config.lora_enabled and not os.path.exists(base_model_path):
+            ## Save the untouched checkpoint once as the base model every adapter is served on
+            AutoModelForSeq2SeqLM.from_pretrained(self.config.model_ckpt).save_pretrained(base_model_path, safe_serialization=True)
+
+        trainer, model_pegasus, tokenizer, _ = self.build_trainer()
         
         if fine_tuning:
             trainer.train()
 
-        ## Save model
-        model_pegasus.save_pretrained(os.path.join(self.config.root_dir,"pegasus-samsum-model"))
+        # The adapter directory is a stage output, so it exists even when LoRA is disabled.
+        os.makedirs(self.config.adapter_dir, exist_ok=True)
+        if self.config.lora_enabled:
+            ## Save only the adapter weights
+            model_pegasus.save_pretrained(os.path.join(self.config.adapter_dir, self.config.adapter_name))
+        else:
+            ## Save model, as safetensors so serving can memory-map the weights
+            model_pegasus.save_pretrained(base_model_path, safe_serialization=True)
         ## Save tokenizer
-        tokenizer.save_pretrained(os.path.join(self.config.root_dir,"tokenizer"))
\ No newline at end of file
+        tokenizer.save_pretrained(os.path.join(self.config.root_dir,"tokenizer"))
+
+
+    def benchmark(self, max_steps: int) -> dict:
+        """
+        The function `benchmark` trains for a fixed number of optimizer steps without evaluating or
+        saving anything and measures the training throughput. The first step, which includes warmup and
+        compilation, is left out of the rates when more than one step ran.
+
+        :param max_steps: The number of optimizer steps to run
+        :return: a dictionary with the samples and real tokens processed per second and the peak
+        resident memory of this process in MB.
+        """
+        trainer, _, _, throughput = self.build_trainer(max_steps=max_steps,
+                                                       output_dir=os.path.join(self.config.root_dir, "benchmark"),
+                                                       evaluate=False)
+        trainer.train()
+
+        steps = throughput.steps[1:] if len(throughput.steps) > 1 else throughput.steps
+        seconds = sum(step["seconds"] for step in steps)
+        return {
+            "steps": len(throughput.steps),
+            "samples_per_second": sum(step["examples"] for step in steps) / seconds if seconds else 0.0,
+            "tokens_per_second": sum(step["tokens"] for step in steps) / seconds if seconds else 0.0,
+            # ru_maxrss is in KB on Linux.
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+
+    def run_benchmarks(self, benchmark_config: TrainingBenchmarkConfig) -> list:
+        """
+        The function `run_benchmarks` benchmarks every configuration of `benchmark_config`, each in a
+        fresh spawned process so that peak memory is measured per configuration, and writes the
+        results to `benchmark_file`.
+
+        :param benchmark_config: The benchmark step count and the configurations to compare, each a
+        name plus `TrainingArguments` overrides
+        :return: the list of results, one dictionary per configuration.
+        """
+        results = []
+        for configuration in benchmark_config.configurations:
+            overrides = {k: v for k, v in configuration.items() if k != "name"}
+            config = dataclasses.replace(self.config, **overrides)
+            logger.info(f"Benchmarking training configuration {configuration['name']}: {overrides}")
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(benchmark_configuration, config, benchmark_config.max_steps).result()
+
+            result = {"name": configuration["name"], **overrides, **result}
+            logger.info(f"{result['name']}: {result['samples_per_second']:.2f} samples/s, "
+                        f"{result['tokens_per_second']:.0f} tokens/s, peak RSS {result['peak_rss_mb']:.0f} MB")
+            results.append(result)
+
+        with open(benchmark_config.benchmark_file, 'w') as f:
+            json.dump(results, f, indent=4)
+
+        return results
+
+
+def benchmark_configuration(config: ModelTrainerConfig, max_steps: int) -> dict:
+    """
+    The function `benchmark_configuration` is the picklable entry point of a benchmark process.
+
+    :param config: The trainer configuration to benchmark
+    :param max_steps: The number of optimizer steps to run
+    :return: the measurements returned by `ModelTrainer.benchmark`.
+    """
+    return ModelTrainer(config).benchmark(max_steps)
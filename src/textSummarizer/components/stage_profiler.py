@@ -0,0 +1,280 @@
+import cProfile
+import glob
+import json
+import os
+import platform
+import pstats
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from textSummarizer.entity import StageProfilerConfig
+from textSummarizer.logging import logger
+
+
+HOTSPOT_PROFILERS = ("none", "cprofile", "py-spy")
+
+# Measurements compared with the previous run of a stage.
+COMPARED_MEASUREMENTS = ("wall_seconds", "cpu_seconds", "peak_rss_mb", "read_bytes", "write_bytes")
+
+
+def read_process_io() -> Dict[str, int]:
+    """
+    The function `read_process_io` reads the I/O counters of the current process from the kernel.
+    :return: a dictionary with the bytes read from and written to storage (`read_bytes`,
+    `write_bytes`) and the bytes passed to read and write calls, page cache hits included (`rchar`,
+    `wchar`), empty where /proc is not available.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f.read().splitlines())
+    except OSError:
+        return {}
+    return {name: int(fields[name]) for name in ("read_bytes", "write_bytes", "rchar", "wchar")}
+
+
+def reset_peak_rss() -> bool:
+    """
+    The function `reset_peak_rss` resets the peak resident set size the kernel records for the
+    current process, so the next `read_peak_rss_mb` covers one stage rather than the process lifetime.
+    :return: True if the peak was reset, False where the kernel does not allow it.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss_mb() -> float:
+    """
+    The function `read_peak_rss_mb` reads the peak resident set size of the current process.
+    :return: the peak since the last `reset_peak_rss`, or since the process started, in MB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_cpu_seconds() -> Dict[str, float]:
+    """
+    The function `read_cpu_seconds` reads the user and system CPU time of the current process and of
+    its terminated children, such as dataloader or evaluation workers.
+    :return: a dictionary with the `self` and `children` CPU seconds.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {"self": own.ru_utime + own.ru_stime, "children": children.ru_utime + children.ru_stime}
+
+
+def get_git_commit() -> Optional[str]:
+    """
+    The function `get_git_commit` identifies the code a run was made with.
+    :return: the current git commit hash, or None outside a git checkout.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def top_functions(profile_file: str, count: int) -> List[dict]:
+    """
+    The function `top_functions` lists the functions a stage spent the most time in.
+
+    :param profile_file: A cProfile dump
+    :param count: The number of functions to list
+    :return: the functions sorted by cumulative time, with their call count and own and cumulative
+    seconds.
+    """
+    stats = pstats.Stats(profile_file).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:count]
+    return [{"function": f"{filename}:{line}({name})", "calls": calls,
+             "own_seconds": own, "cumulative_seconds": cumulative}
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+
+# The StageProfiler class measures a pipeline stage in the process that runs it: wall and CPU time,
+# peak RSS and storage I/O, plus a hot-function profile when `hotspots` is "cprofile" or "py-spy".
+# Profiles are written to `run_dir`. It also writes and compares the run reports under `root_dir`.
+class StageProfiler:
+    def __init__(self, config: StageProfilerConfig, run_id: str = None):
+        """
+        :param config: The profiler configuration
+        :param run_id: The ID of the run, which names its report and profile directory. Defaults to
+        the current UTC time (optional)
+        """
+        if config.hotspots not in HOTSPOT_PROFILERS:
+            raise ValueError(f"Unknown hot-function profiler {config.hotspots}, expected one of {HOTSPOT_PROFILERS}")
+        self.config = config
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        self.run_dir = os.path.join(self.config.root_dir, "runs", self.run_id)
+
+
+    @contextmanager
+    def profile(self, name: str):
+        """
+        The function `profile` measures the body of the `with` block.
+
+        :param name: The file name the hot-function profile is saved under, e.g. the stage class name
+        :return: a context manager yielding the dictionary that receives the measurements on exit.
+        CPU time of child processes only counts children that exited during the block, and their I/O
+        is not counted.
+        """
+        measurements = {}
+        if self.config.hotspots != "none":
+            os.makedirs(self.run_dir, exist_ok=True)
+        measurements["peak_rss_reset"] = reset_peak_rss()
+        io_before = read_process_io()
+        cpu_before = read_cpu_seconds()
+        start = time.perf_counter()
+
+        profiler = None
+        sampler = None
+        if self.config.hotspots == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.config.hotspots == "py-spy":
+            sampler = self._start_py_spy(name)
+
+        try:
+            yield measurements
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                measurements["hotspot_file"] = self._stop_py_spy(sampler)
+
+            measurements["wall_seconds"] = time.perf_counter() - start
+            cpu_after = read_cpu_seconds()
+            measurements["cpu_seconds"] = cpu_after["self"] - cpu_before["self"]
+            measurements["children_cpu_seconds"] = cpu_after["children"] - cpu_before["children"]
+            measurements["peak_rss_mb"] = read_peak_rss_mb()
+            io_after = read_process_io()
+            for key in io_after:
+                measurements[key] = io_after[key] - io_before[key]
+
+            if profiler is not None:
+                profile_file = os.path.join(self.run_dir, f"{name}.prof")
+                profiler.dump_stats(profile_file)
+                measurements["hotspot_file"] = profile_file
+                measurements["top_functions"] = top_functions(profile_file, self.config.top_functions)
+
+
+    def _start_py_spy(self, name: str):
+        executable = shutil.which("py-spy")
+        if executable is None:
+            logger.warning("py-spy is not installed, stage profiled without hot functions")
+            return None
+        output = os.path.join(self.run_dir, f"{name}.speedscope.json")
+        command = [executable, "record", "--pid", str(os.getpid()), "--rate", str(self.config.py_spy_rate),
+                   "--subprocesses", "--format", "speedscope", "--output", output]
+        return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL), output
+
+
+    def _stop_py_spy(self, sampler) -> Optional[str]:
+        process, output = sampler
+        # py-spy writes its profile when interrupted.
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        return output if os.path.exists(output) else None
+
+
+    def report_file(self, run_id: str = None) -> str:
+        return os.path.join(self.config.root_dir, "runs", f"{run_id or self.run_id}.json")
+
+
+    def previous_reports(self) -> List[dict]:
+        """
+        The function `previous_reports` loads the reports of earlier runs.
+        :return: the reports, newest first by start time, whatever their run IDs.
+        """
+        reports = []
+        for path in glob.glob(os.path.join(self.config.root_dir, "runs", "*.json")):
+            if path == self.report_file():
+                continue
+            with open(path) as f:
+                reports.append(json.load(f))
+        return sorted(reports, key=lambda report: report["started_at"], reverse=True)
+
+
+    def compare(self, stages: List[dict]) -> List[dict]:
+        """
+        The function `compare` compares every stage that ran with its latest earlier run, so
+        consecutive runs show whether a stage got slower or hungrier. A stage counts as a regression
+        when its wall time grew by more than `regression_threshold` times.
+
+        :param stages: The stage entries of the current run
+        :return: the regressions, one entry per slower stage.
+        """
+        previous = self.previous_reports()
+        regressions = []
+        for entry in stages:
+            if entry["status"] != "completed":
+                continue
+            baseline = next((stage for report in previous for stage in report["stages"]
+                             if stage["stage"] == entry["stage"] and stage["status"] == "completed"), None)
+            if baseline is None:
+                continue
+
+            comparison = {"run_id": baseline["run_id"], "same_inputs": baseline["hash"] == entry["hash"]}
+            for key in COMPARED_MEASUREMENTS:
+                if baseline.get(key) and entry.get(key) is not None:
+                    comparison[f"{key}_ratio"] = entry[key] / baseline[key]
+            entry["baseline"] = comparison
+
+            if comparison.get("wall_seconds_ratio", 0) > self.config.regression_threshold:
+                regressions.append({"stage": entry["stage"], **comparison})
+                logger.warning(f"Stage {entry['stage']} took {comparison['wall_seconds_ratio']:.2f}x as long as in "
+                               f"run {baseline['run_id']} ({baseline['wall_seconds']:.1f}s -> {entry['wall_seconds']:.1f}s)")
+        return regressions
+
+
+    def write_report(self, stages: List[dict], started: float, force: bool = False) -> dict:
+        """
+        The function `write_report` writes the JSON run report to `root_dir/runs/<run_id>.json` and a
+        copy to `root_dir/latest.json`.
+
+        :param stages: One entry per stage with its status ("completed", "skipped" or "failed"), its
+        input hash and, when it ran, its measurements
+        :param started: The `time.time()` the run started at
+        :param force: Whether the run ignored up-to-date stages, defaults to False (optional)
+        :return: the report.
+        """
+        for entry in stages:
+            entry["run_id"] = self.run_id
+        regressions = self.compare(stages)
+        report = {
+            "run_id": self.run_id,
+            "git_commit": get_git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": started,
+            "wall_seconds": time.time() - started,
+            "force": force,
+            "hotspots": self.config.hotspots,
+            "stages": stages,
+            "regressions": regressions,
+        }
+
+        os.makedirs(os.path.dirname(self.report_file()), exist_ok=True)
+        for path in (self.report_file(), os.path.join(self.config.root_dir, "latest.json")):
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=4)
+        logger.info(f"Run report written to {self.report_file()}")
+        return report
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from textSummarizer.entity import SummaryCacheConfig
+from textSummarizer.logging import logger
+from textSummarizer.utils.common import get_directory_fingerprint
+
+
+# The SummaryCache class stores generated summaries keyed by a hash of the normalized input text, the
+# model revision and the generation parameters. It has a bounded in-memory LRU tier and an optional
+# SQLite tier that survives restarts.
+class SummaryCache:
+    def __init__(self, config: SummaryCacheConfig, model_id: str = ""):
+        """
+        :param config: The cache limits and storage locations
+        :param model_id: Identifies the served model variant (e.g. its path), so summaries of the fp32
+        and quantized models never share entries (optional)
+        """
+        self.config = config
+        self.model_id = str(model_id)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._revision = None
+        self._revision_checked_at = 0.0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+
+        if config.enabled and config.disk_enabled:
+            self._db = sqlite3.connect(str(config.db_file), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS summaries "
+                "(key TEXT PRIMARY KEY, revision TEXT NOT NULL, summary TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+
+    def model_revision(self) -> str:
+        """
+        The function `model_revision` fingerprints the served model artifacts from the path, size and
+        modification time of every file under `model_paths`. The fingerprint is recomputed at most once
+        every `revision_check_seconds`; when it changes the in-memory tier is cleared and disk entries
+        of older revisions are deleted.
+        :return: a hex digest identifying the current model artifacts.
+        """
+        now = time.monotonic()
+        if self._revision is not None and now - self._revision_checked_at < self.config.revision_check_seconds:
+            return self._revision
+
+        revision = get_directory_fingerprint(*self.config.model_paths)
+
+        with self._lock:
+            if self._revision is not None and revision != self._revision:
+                logger.info(f"Model artifacts in {', '.join(map(str, self.config.model_paths))} changed, "
+                            f"invalidating summary cache")
+                self._memory.clear()
+                self._memory_bytes = 0
+                if self._db is not None:
+                    self._db.execute("DELETE FROM summaries WHERE revision != ?", (revision,))
+                    self._db.commit()
+            self._revision = revision
+            self._revision_checked_at = now
+
+        return revision
+
+
+    def make_key(self, text: str, gen_kwargs: Dict[str, Any], revision: str) -> str:
+        """
+        The function `make_key` builds the content address of a summary.
+
+        :param text: The input dialogue. Whitespace differences are normalized away
+        :param gen_kwargs: The effective generation parameters used to produce the summary
+        :param revision: The model revision returned by `model_revision`
+        :return: a hex sha256 digest.
+        """
+        payload = json.dumps({
+            "text": " ".join(text.split()),
+            "gen_kwargs": gen_kwargs,
+            "revision": revision,
+            "model_id": self.model_id,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+    def get(self, text: str, gen_kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        The function `get` looks a summary up in the memory tier, then in the disk tier. Disk hits are
+        promoted into memory.
+
+        :param text: The input dialogue
+        :param gen_kwargs: The effective generation parameters
+        :return: the cached summary, or None on a miss or when the cache is disabled.
+        """
+        if not self.config.enabled:
+            return None
+
+        revision = self.model_revision()
+        key = self.make_key(text, gen_kwargs, revision)
+
+        with self._lock:
+            summary = self._memory.get(key)
+            if summary is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return summary
+
+            if self._db is not None:
+                row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._counters["disk_hits"] += 1
+                    self._remember(key, row[0])
+                    return row[0]
+
+            self._counters["misses"] += 1
+            return None
+
+
+    def put(self, text: str, gen_kwargs: Dict[str, Any], summary: str):
+        """
+        The function `put` stores a freshly generated summary in every enabled tier.
+
+        :param text: The input dialogue
+        :param gen_kwargs: The effective generation parameters used to produce `summary`
+        :param summary: The generated summary
+        """
+        if not self.config.enabled:
+            return
+
+        revision = self.model_revision()
+        key = self.make_key(text, gen_kwargs, revision)
+
+        with self._lock:
+            self._remember(key, summary)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO summaries (key, revision, summary) VALUES (?, ?, ?)",
+                                 (key, revision, summary))
+                self._db.commit()
+
+
+    def _remember(self, key: str, summary: str):
+        size = len(key) + len(summary.encode("utf-8"))
+        if size > self.config.max_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(key) + len(previous.encode("utf-8"))
+
+        self._memory[key] = summary
+        self._memory_bytes += size
+
+        while len(self._memory) > self.config.max_entries or self._memory_bytes > self.config.max_bytes:
+            old_key, old_summary = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_key) + len(old_summary.encode("utf-8"))
+            self._counters["evictions"] += 1
+
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        The function `stats` returns the cache counters and current size.
+        :return: a dictionary with hit, miss and eviction counts, the hit rate and the number of
+        entries and bytes held in memory.
+        """
+        counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_rate"] = (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else 0.0
+        counters["entries"] = len(self._memory)
+        counters["bytes"] = self._memory_bytes
+        return counters
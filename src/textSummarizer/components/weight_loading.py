@@ -0,0 +1,106 @@
+import json
+import math
+import mmap
+import os
+import struct
+from itertools import chain
+from typing import Dict, List
+import torch
+from transformers import AutoConfig, AutoModelForSeq2SeqLM, GenerationConfig
+from textSummarizer.logging import logger
+
+
+SAFETENSORS_WEIGHTS_FILE = "model.safetensors"
+SAFETENSORS_INDEX_FILE = "model.safetensors.index.json"
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def get_safetensors_files(model_path) -> List[str]:
+    """
+    The function `get_safetensors_files` lists the safetensors weight files of a saved model.
+
+    :param model_path: The model directory
+    :return: the paths of its weight files, empty if the model was not saved as safetensors.
+    """
+    index_file = os.path.join(model_path, SAFETENSORS_INDEX_FILE)
+    if os.path.exists(index_file):
+        with open(index_file) as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(model_path, shard) for shard in shards]
+
+    weights_file = os.path.join(model_path, SAFETENSORS_WEIGHTS_FILE)
+    return [weights_file] if os.path.exists(weights_file) else []
+
+
+def load_mmap_state_dict(path) -> Dict[str, torch.Tensor]:
+    """
+    The function `load_mmap_state_dict` maps a safetensors file into memory without reading it. The
+    returned tensors are views of a private copy-on-write mapping: their pages come from the page
+    cache, so every process mapping the same file shares one copy, and writing to a tensor never
+    changes the file.
+
+    :param path: The safetensors file
+    :return: a dictionary mapping every tensor name to a tensor backed by the mapping.
+    """
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    state_dict = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        count = math.prod(info["shape"])
+        if not count:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        offset = data_start + info["data_offsets"][0]
+        state_dict[name] = torch.frombuffer(buffer, dtype=dtype, offset=offset, count=count).view(info["shape"])
+    return state_dict
+
+
+def load_mmap_model(model_path, torch_dtype: str = "float32"):
+    """
+    The function `load_mmap_model` builds a seq2seq model whose weights are the memory-mapped tensors
+    of its safetensors files, instead of copying them into freshly allocated parameters like
+    `from_pretrained` does. Loading only reads the file headers, and the weights are paged in on first
+    use.
+
+    :param model_path: The model directory written by `save_pretrained` with safetensors
+    :param torch_dtype: The name of the torch dtype to serve in. Weights stored in another dtype are
+    converted, which gives that process a private copy of them, defaults to float32 (optional)
+    :return: the loaded model, in eval mode on the CPU.
+    """
+    dtype = getattr(torch, torch_dtype)
+    state_dict = {}
+    for path in get_safetensors_files(model_path):
+        state_dict.update(load_mmap_state_dict(path))
+
+    converted = [name for name, tensor in state_dict.items() if tensor.is_floating_point() and tensor.dtype != dtype]
+    if converted:
+        logger.warning(f"{len(converted)} weights of {model_path} are not stored as {torch_dtype} and are copied to convert them")
+        state_dict.update({name: state_dict[name].to(dtype) for name in converted})
+
+    config = AutoConfig.from_pretrained(model_path)
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(config, torch_dtype=dtype)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+
+    missing = [name for name, tensor in chain(model.named_parameters(), model.named_buffers()) if tensor.is_meta]
+    if missing:
+        raise ValueError(f"{model_path} has no weights for {', '.join(missing[:5])}")
+
+    if os.path.exists(os.path.join(model_path, "generation_config.json")):
+        model.generation_config = GenerationConfig.from_pretrained(model_path)
+
+    model.eval()
+    return model
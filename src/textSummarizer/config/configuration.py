@@ -4,7 +4,22 @@ from textSummarizer.entity import (DataIngestionConfig,
                                    DataValidationConfig,
                                    DataTransformationConfig,
                                    ModelTrainerConfig,
-                                   ModelEvaluationConfig)
+                                   TrainingBenchmarkConfig,
+                                   ModelEvaluationConfig,
+                                   ModelQuantizationConfig,
+                                   ModelDistillationConfig,
+                                   ModelExportConfig,
+                                   PredictionConfig,
+                                   BatchSchedulerConfig,
+                                   InferencePoolConfig,
+                                   SummaryCacheConfig,
+                                   StreamingConfig,
+                                   LongDocumentConfig,
+                                   StageRunnerConfig,
+                                   ImportBenchmarkConfig,
+                                   LoadBenchmarkConfig,
+                                   StageProfilerConfig,
+                                   InferenceBenchmarkConfig)
 
 # The ConfigurationManager class is used for managing configuration settings in a Python program.
 class ConfigurationManager:
@@ -64,13 +79,18 @@ class ConfigurationManager:
         :return: an instance of the DataTransformationConfig class.
         """
         config = self.config.data_transformation
+        params = self.params.DataTransformation
 
         create_directories([config.root_dir])
 
         data_transformation_config = DataTransformationConfig(
             root_dir=config.root_dir,
             data_path=config.data_path,
-            tokenizer_name = config.tokenizer_name
+            tokenizer_name = config.tokenizer_name,
+            max_input_length = params.max_input_length,
+            max_target_length = params.max_target_length,
+            num_proc = params.num_proc,
+            batch_size = params.batch_size
         )
 
         return data_transformation_config
@@ -83,6 +103,7 @@ class ConfigurationManager:
         """
         config = self.config.model_trainer
         params = self.params.TrainingArguments
+        lora = self.params.LoRA
 
         create_directories([config.root_dir])
 
@@ -90,19 +111,51 @@ class ConfigurationManager:
             root_dir=config.root_dir,
             data_path=config.data_path,
             model_ckpt = config.model_ckpt,
+            fine_tuning = params.fine_tuning,
             num_train_epochs = params.num_train_epochs,
             warmup_steps = params.warmup_steps,
             per_device_train_batch_size = params.per_device_train_batch_size,
             weight_decay = params.weight_decay,
             logging_steps = params.logging_steps,
             evaluation_strategy = params.evaluation_strategy,
-            eval_steps = params.evaluation_strategy,
-            save_steps = params.save_steps,
-            gradient_accumulation_steps = params.gradient_accumulation_steps
+            eval_steps = params.eval_steps,
+            save_steps = float(params.save_steps), # YAML reads 1e6 as a string
+            gradient_accumulation_steps = params.gradient_accumulation_steps,
+            max_tokens_per_batch = params.max_tokens_per_batch,
+            dataloader_num_workers = params.dataloader_num_workers,
+            gradient_checkpointing = params.gradient_checkpointing,
+            bf16 = params.bf16,
+            torch_compile = params.torch_compile,
+            adapter_dir = config.adapter_dir,
+            lora_enabled = lora.enabled,
+            adapter_name = lora.adapter_name,
+            lora_r = lora.r,
+            lora_alpha = lora.alpha,
+            lora_dropout = lora.dropout,
+            lora_target_modules = list(lora.target_modules)
         )
 
         return model_trainer_config
     
+    def get_training_benchmark_config(self) -> TrainingBenchmarkConfig:
+        """
+        The function `get_training_benchmark_config` returns a `TrainingBenchmarkConfig` object with
+        the step count and the training configurations compared by `main.py --benchmark`.
+        :return: an instance of the TrainingBenchmarkConfig class.
+        """
+        config = self.config.model_trainer
+        params = self.params.TrainingBenchmark
+
+        create_directories([config.root_dir])
+
+        training_benchmark_config = TrainingBenchmarkConfig(
+            benchmark_file = config.benchmark_file,
+            max_steps = params.max_steps,
+            configurations = [dict(c) for c in params.configurations]
+        )
+
+        return training_benchmark_config
+    
     def get_model_evaluation_config(self) -> ModelEvaluationConfig:
         """
         The function `get_model_evaluation_config` returns a `ModelEvaluationConfig` object with the
@@ -110,6 +163,7 @@ class ConfigurationManager:
         :return: an instance of the ModelEvaluationConfig class.
         """
         config = self.config.model_evaluation
+        params = self.params.Evaluation
 
         create_directories([config.root_dir])
 
@@ -118,8 +172,372 @@ class ConfigurationManager:
             data_path=config.data_path,
             model_path = config.model_path,
             tokenizer_path = config.tokenizer_path,
-            metric_file_name = config.metric_file_name
-           
+            metric_file_name = config.metric_file_name,
+            predictions_dir = config.predictions_dir,
+            max_tokens_per_batch = params.max_tokens_per_batch,
+            num_samples = params.num_samples,
+            num_shards = params.num_shards,
+            threads_per_worker = params.threads_per_worker,
+            rouge_num_proc = params.rouge_num_proc
+        )
+
+        return model_evaluation_config
+    
+    def get_model_quantization_config(self) -> ModelQuantizationConfig:
+        """
+        The function `get_model_quantization_config` returns a `ModelQuantizationConfig` object with
+        the specified configuration parameters.
+        :return: an instance of the ModelQuantizationConfig class.
+        """
+        config = self.config.model_quantization
+        params = self.params.Quantization
+
+        create_directories([config.root_dir])
+
+        model_quantization_config = ModelQuantizationConfig(
+            root_dir=config.root_dir,
+            data_path=config.data_path,
+            model_path = config.model_path,
+            tokenizer_path = config.tokenizer_path,
+            quantized_model_path = config.quantized_model_path,
+            report_file = config.report_file,
+            dtype = params.dtype,
+            rouge_tolerance = params.rouge_tolerance,
+            num_samples = params.num_samples
+        )
+
+        return model_quantization_config
+    
+    def get_model_distillation_config(self) -> ModelDistillationConfig:
+        """
+        The function `get_model_distillation_config` returns a `ModelDistillationConfig` object with
+        the student size, distillation training settings and the settings of the teacher/student
+        comparison.
+        :return: an instance of the ModelDistillationConfig class.
+        """
+        config = self.config.model_distillation
+        params = self.params.Distillation
+        generation = self.params.GenerationArguments
+
+        create_directories([config.root_dir])
+
+        model_distillation_config = ModelDistillationConfig(
+            root_dir=config.root_dir,
+            data_path=config.data_path,
+            teacher_model_path = config.teacher_model_path,
+            tokenizer_path = config.tokenizer_path,
+            student_model_path = config.student_model_path,
+            report_file = config.report_file,
+            student_decoder_layers = params.student_decoder_layers,
+            temperature = params.temperature,
+            alpha = params.alpha,
+            num_train_epochs = params.num_train_epochs,
+            learning_rate = float(params.learning_rate),
+            warmup_steps = params.warmup_steps,
+            max_tokens_per_batch = params.max_tokens_per_batch,
+            gradient_accumulation_steps = params.gradient_accumulation_steps,
+            num_samples = params.num_samples,
+            latency_samples = params.latency_samples,
+            gen_kwargs = {
+                "length_penalty": generation.length_penalty,
+                "num_beams": generation.num_beams,
+                "max_length": generation.max_length
+            }
+        )
+
+        return model_distillation_config
+    
+    def get_model_export_config(self) -> ModelExportConfig:
+        """
+        The function `get_model_export_config` returns a `ModelExportConfig` object with the specified
+        configuration parameters.
+        :return: an instance of the ModelExportConfig class.
+        """
+        config = self.config.model_export
+        params = self.params.ModelExport
+        generation = self.params.GenerationArguments
+
+        create_directories([config.root_dir])
+
+        model_export_config = ModelExportConfig(
+            root_dir=config.root_dir,
+            data_path=config.data_path,
+            model_path = config.model_path,
+            tokenizer_path = config.tokenizer_path,
+            onnx_model_path = config.onnx_model_path,
+            parity_file = config.parity_file,
+            parity_samples = params.parity_samples,
+            min_exact_match = params.min_exact_match,
+            gen_kwargs = {
+                "length_penalty": generation.length_penalty,
+                "num_beams": generation.num_beams,
+                "max_length": generation.max_length
+            }
+        )
+
+        return model_export_config
+    
+    def get_prediction_config(self) -> PredictionConfig:
+        """
+        The function `get_prediction_config` returns a `PredictionConfig` object with the model
+        artifacts, device placement and generation parameters used for serving.
+        :return: an instance of the PredictionConfig class.
+        """
+        config = self.config.prediction
+        params = self.params.GenerationArguments
+        encoder_cache = self.params.EncoderCache
+        adapters = self.params.Adapters
+
+        if config.variant not in ("fp32", "quantized"):
+            raise ValueError(f"Unknown prediction variant: {config.variant}")
+        if config.backend not in ("pytorch", "onnx"):
+            raise ValueError(f"Unknown prediction backend: {config.backend}")
+        if config.backend == "onnx" and config.variant != "fp32":
+            raise ValueError("The onnx backend serves the exported fp32 model only")
+
+        if config.backend == "onnx":
+            model_path = config.onnx_model_path
+        elif config.variant == "quantized":
+            model_path = config.quantized_model_path
+        else:
+            model_path = config.model_path
+
+        prediction_config = PredictionConfig(
+            model_path = model_path,
+            tokenizer_path = config.tokenizer_path,
+            device = config.device,
+            torch_dtype = config.torch_dtype,
+            max_input_length = config.max_input_length,
+            warmup_on_startup = config.warmup_on_startup,
+            encoder_cache_bytes = encoder_cache.max_bytes if encoder_cache.enabled else 0,
+            adapter_dir = config.adapter_dir,
+            max_loaded_adapters = adapters.max_loaded if adapters.enabled else 0,
+            mmap_weights = config.mmap_weights,
+            gen_kwargs = {
+                "length_penalty": params.length_penalty,
+                "num_beams": params.num_beams,
+                "max_length": params.max_length
+            }
+        )
+
+        return prediction_config
+    
+    def get_batch_scheduler_config(self) -> BatchSchedulerConfig:
+        """
+        The function `get_batch_scheduler_config` returns a `BatchSchedulerConfig` object with the
+        micro-batching parameters used by the serving app.
+        :return: an instance of the BatchSchedulerConfig class.
+        """
+        params = self.params.BatchScheduler
+
+        batch_scheduler_config = BatchSchedulerConfig(
+            max_batch_size = params.max_batch_size,
+            max_wait_ms = params.max_wait_ms
+        )
+
+        return batch_scheduler_config
+    
+    def get_inference_pool_config(self) -> InferencePoolConfig:
+        """
+        The function `get_inference_pool_config` returns an `InferencePoolConfig` object with the
+        executor type, worker count and admission queue size used by the serving app.
+        :return: an instance of the InferencePoolConfig class.
+        """
+        params = self.params.InferencePool
+
+        inference_pool_config = InferencePoolConfig(
+            executor = params.executor,
+            max_workers = params.max_workers,
+            threads_per_worker = params.threads_per_worker,
+            max_queue_size = params.max_queue_size,
+            retry_after_seconds = params.retry_after_seconds
+        )
+
+        return inference_pool_config
+    
+    def get_summary_cache_config(self) -> SummaryCacheConfig:
+        """
+        The function `get_summary_cache_config` returns a `SummaryCacheConfig` object with the
+        summary cache limits and storage locations. The cache is invalidated by changes to the
+        artifacts the server actually loads: the model of the configured variant and backend, its
+        tokenizer and, when adapters are served, the adapter directory.
+        :return: an instance of the SummaryCacheConfig class.
+        """
+        config = self.config.summary_cache
+        params = self.params.SummaryCache
+        prediction_config = self.get_prediction_config()
+
+        model_paths = [prediction_config.model_path, prediction_config.tokenizer_path]
+        if prediction_config.max_loaded_adapters:
+            model_paths.append(prediction_config.adapter_dir)
+
+        if params.disk_enabled:
+            create_directories([config.root_dir])
+
+        summary_cache_config = SummaryCacheConfig(
+            root_dir = config.root_dir,
+            db_file = config.db_file,
+            model_paths = model_paths,
+            enabled = params.enabled,
+            max_entries = params.max_entries,
+            max_bytes = params.max_bytes,
+            disk_enabled = params.disk_enabled,
+            revision_check_seconds = params.revision_check_seconds
+        )
+
+        return summary_cache_config
+    
+    def get_streaming_config(self) -> StreamingConfig:
+        """
+        The function `get_streaming_config` returns a `StreamingConfig` object with the greedy or
+        sampling decode settings used for token streaming.
+        :return: an instance of the StreamingConfig class.
+        """
+        params = self.params.Streaming
+
+        gen_kwargs = {"num_beams": 1, "do_sample": params.do_sample}
+        if params.do_sample:
+            gen_kwargs.update(temperature=params.temperature, top_p=params.top_p)
+
+        streaming_config = StreamingConfig(
+            max_concurrent_streams = params.max_concurrent_streams,
+            gen_kwargs = gen_kwargs
+        )
+
+        return streaming_config
+    
+    def get_long_document_config(self) -> LongDocumentConfig:
+        """
+        The function `get_long_document_config` returns a `LongDocumentConfig` object with the
+        chunking and reduction parameters of long-document summarization.
+        :return: an instance of the LongDocumentConfig class.
+        """
+        params = self.params.LongDocument
+        # Windows hold chunk_size - 1 tokens (see `LongDocumentSummarizer.split`), and consecutive
+        # windows must advance.
+        if not 0 <= params.chunk_overlap < params.chunk_size - 1:
+            raise ValueError("chunk_overlap must be at least 0 and smaller than chunk_size - 1")
+
+        long_document_config = LongDocumentConfig(
+            chunk_size = params.chunk_size,
+            chunk_overlap = params.chunk_overlap,
+            max_reduction_depth = params.max_reduction_depth
+        )
+
+        return long_document_config
+    
+    def get_stage_runner_config(self) -> StageRunnerConfig:
+        """
+        The function `get_stage_runner_config` returns a `StageRunnerConfig` object with the location
+        of the stage completion records and the stage concurrency limit of `main.py`.
+        :return: an instance of the StageRunnerConfig class.
+        """
+        config = self.config.stage_runner
+        params = self.params.StageRunner
+
+        create_directories([config.root_dir])
+
+        stage_runner_config = StageRunnerConfig(
+            root_dir = config.root_dir,
+            max_parallel_stages = params.max_parallel_stages
+        )
+
+        return stage_runner_config
+    
+    def get_import_benchmark_config(self) -> ImportBenchmarkConfig:
+        """
+        The function `get_import_benchmark_config` returns an `ImportBenchmarkConfig` object with the
+        module whose import time `main.py --import-benchmark` checks and its budget.
+        :return: an instance of the ImportBenchmarkConfig class.
+        """
+        config = self.config.import_benchmark
+        params = self.params.ImportBenchmark
+
+        create_directories([config.root_dir])
+
+        import_benchmark_config = ImportBenchmarkConfig(
+            root_dir = config.root_dir,
+            report_file = config.report_file,
+            module = params.module,
+            repeats = params.repeats,
+            max_seconds = params.max_seconds,
+            forbidden_modules = list(params.forbidden_modules),
+            top_modules = params.top_modules
+        )
+
+        return import_benchmark_config
+    
+    def get_load_benchmark_config(self) -> LoadBenchmarkConfig:
+        """
+        The function `get_load_benchmark_config` returns a `LoadBenchmarkConfig` object with the report
+        location and worker count of `main.py --load-benchmark`.
+        :return: an instance of the LoadBenchmarkConfig class.
+        """
+        config = self.config.load_benchmark
+        params = self.params.LoadBenchmark
+
+        create_directories([config.root_dir])
+
+        load_benchmark_config = LoadBenchmarkConfig(
+            root_dir = config.root_dir,
+            report_file = config.report_file,
+            num_workers = params.num_workers
+        )
+
+        return load_benchmark_config
+    
+    def get_stage_profiler_config(self) -> StageProfilerConfig:
+        """
+        The function `get_stage_profiler_config` returns a `StageProfilerConfig` object with the run
+        report location and the profiling options of `main.py`.
+        :return: an instance of the StageProfilerConfig class.
+        """
+        config = self.config.stage_profiler
+        params = self.params.StageProfiler
+
+        create_directories([config.root_dir])
+
+        stage_profiler_config = StageProfilerConfig(
+            root_dir = config.root_dir,
+            enabled = params.enabled,
+            hotspots = params.hotspots,
+            top_functions = params.top_functions,
+            py_spy_rate = params.py_spy_rate,
+            regression_threshold = float(params.regression_threshold)
+        )
+
+        return stage_profiler_config
+    
+    def get_inference_benchmark_config(self) -> InferenceBenchmarkConfig:
+        """
+        The function `get_inference_benchmark_config` returns an `InferenceBenchmarkConfig` object with
+        the fixture model size and the measurements of `main.py --inference-benchmark`.
+        :return: an instance of the InferenceBenchmarkConfig class.
+        """
+        config = self.config.inference_benchmark
+        params = self.params.InferenceBenchmark
+
+        create_directories([config.root_dir])
+
+        inference_benchmark_config = InferenceBenchmarkConfig(
+            root_dir = config.root_dir,
+            fixture_dir = config.fixture_dir,
+            report_file = config.report_file,
+            seed = params.seed,
+            vocab_size = params.vocab_size,
+            d_model = params.d_model,
+            num_layers = params.num_layers,
+            num_heads = params.num_heads,
+            ffn_dim = params.ffn_dim,
+            num_dialogues = params.num_dialogues,
+            dialogue_words = params.dialogue_words,
+            latency_samples = params.latency_samples,
+            num_beams = list(params.num_beams),
+            max_lengths = list(params.max_lengths),
+            batch_size = params.batch_size,
+            concurrency_levels = list(params.concurrency_levels),
+            requests_per_level = params.requests_per_level,
+            startup_timeout_seconds = params.startup_timeout_seconds
         )
 
-        return model_evaluation_config
\ No newline at end of file
+        return inference_benchmark_config
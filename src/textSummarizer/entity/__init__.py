@@ -29,6 +29,10 @@ class DataTransformationConfig:
     root_dir: Path
     data_path: Path
     tokenizer_name: Path
+    max_input_length: int
+    max_target_length: int
+    num_proc: int
+    batch_size: int
 
 @dataclass(frozen=True)
 # The DataTransformationConfig class is used for configuring data transformation operations.
@@ -36,6 +40,10 @@ class DataTransformationConfig:
     root_dir: Path
     data_path: Path
     tokenizer_name: Path
+    max_input_length: int
+    max_target_length: int
+    num_proc: int
+    batch_size: int
 
 @dataclass(frozen=True)
 # The `ModelTrainerConfig` class is used to store configuration settings for training a model.
@@ -43,6 +51,7 @@ class ModelTrainerConfig:
     root_dir: Path
     data_path: Path
     model_ckpt: Path
+    fine_tuning: bool
     num_train_epochs: int
     warmup_steps: int
     per_device_train_batch_size: int
@@ -52,6 +61,26 @@ class ModelTrainerConfig:
     eval_steps: int
     save_steps: float
     gradient_accumulation_steps: int
+    max_tokens_per_batch: int
+    dataloader_num_workers: int
+    gradient_checkpointing: bool
+    bf16: bool
+    torch_compile: bool
+    adapter_dir: Path
+    lora_enabled: bool
+    adapter_name: str
+    lora_r: int
+    lora_alpha: int
+    lora_dropout: float
+    lora_target_modules: list
+
+@dataclass(frozen=True)
+# The `TrainingBenchmarkConfig` class holds the number of training steps to time and the list of
+# training configurations, each a name plus `TrainingArguments` overrides, to compare.
+class TrainingBenchmarkConfig:
+    benchmark_file: Path
+    max_steps: int
+    configurations: list
 
 @dataclass(frozen=True)
 # The ModelEvaluationConfig class is used to configure the evaluation of a machine learning model.
@@ -61,3 +90,181 @@ class ModelEvaluationConfig:
     model_path: Path
     tokenizer_path: Path
     metric_file_name: Path
+    predictions_dir: Path
+    max_tokens_per_batch: int
+    num_samples: int
+    num_shards: int
+    threads_per_worker: int
+    rouge_num_proc: int
+
+@dataclass(frozen=True)
+# The `ModelQuantizationConfig` class is used to configure the quantization of the trained model and
+# the ROUGE gate that decides whether the quantized copy is published.
+class ModelQuantizationConfig:
+    root_dir: Path
+    data_path: Path
+    model_path: Path
+    tokenizer_path: Path
+    quantized_model_path: Path
+    report_file: Path
+    dtype: str
+    rouge_tolerance: float
+    num_samples: int
+
+@dataclass(frozen=True)
+# The `ModelDistillationConfig` class is used to configure the distillation of the trained model into a
+# student with fewer decoder layers and the latency-vs-ROUGE comparison of teacher and student.
+class ModelDistillationConfig:
+    root_dir: Path
+    data_path: Path
+    teacher_model_path: Path
+    tokenizer_path: Path
+    student_model_path: Path
+    report_file: Path
+    student_decoder_layers: int
+    temperature: float
+    alpha: float
+    num_train_epochs: int
+    learning_rate: float
+    warmup_steps: int
+    max_tokens_per_batch: int
+    gradient_accumulation_steps: int
+    num_samples: int
+    latency_samples: int
+    gen_kwargs: dict
+
+@dataclass(frozen=True)
+# The `ModelExportConfig` class is used to configure the ONNX export of the trained model and the
+# parity check against the PyTorch model.
+class ModelExportConfig:
+    root_dir: Path
+    data_path: Path
+    model_path: Path
+    tokenizer_path: Path
+    onnx_model_path: Path
+    parity_file: Path
+    parity_samples: int
+    min_exact_match: float
+    gen_kwargs: dict
+
+@dataclass(frozen=True)
+# The `PredictionConfig` class holds the model artifacts, device placement and generation settings
+# used when serving summaries.
+class PredictionConfig:
+    model_path: Path
+    tokenizer_path: Path
+    device: str
+    torch_dtype: str
+    max_input_length: int
+    warmup_on_startup: bool
+    encoder_cache_bytes: int
+    adapter_dir: Path
+    max_loaded_adapters: int
+    mmap_weights: bool
+    gen_kwargs: dict
+
+@dataclass(frozen=True)
+# The `BatchSchedulerConfig` class holds how long and how many requests the serving app gathers into
+# a single generate batch.
+class BatchSchedulerConfig:
+    max_batch_size: int
+    max_wait_ms: float
+
+@dataclass(frozen=True)
+# The `InferencePoolConfig` class holds the executor that runs blocking inference off the event loop
+# and the size of the admission queue in front of it.
+class InferencePoolConfig:
+    executor: str
+    max_workers: int
+    threads_per_worker: int
+    max_queue_size: int
+    retry_after_seconds: int
+
+@dataclass(frozen=True)
+# The `SummaryCacheConfig` class holds the limits of the in-memory summary cache, the location of its
+# optional on-disk tier and the model artifacts whose changes invalidate it.
+class SummaryCacheConfig:
+    root_dir: Path
+    db_file: Path
+    model_paths: list
+    enabled: bool
+    max_entries: int
+    max_bytes: int
+    disk_enabled: bool
+    revision_check_seconds: float
+
+@dataclass(frozen=True)
+# The `StreamingConfig` class holds the decoding settings and concurrency limit of token streaming.
+class StreamingConfig:
+    max_concurrent_streams: int
+    gen_kwargs: dict
+
+@dataclass(frozen=True)
+# The `LongDocumentConfig` class holds the token window size, window overlap and maximum number of
+# reduction rounds used to summarize inputs longer than the model's context.
+class LongDocumentConfig:
+    chunk_size: int
+    chunk_overlap: int
+    max_reduction_depth: int
+
+@dataclass(frozen=True)
+# The `StageRunnerConfig` class holds where the pipeline records completed stages and how many
+# independent stages may run at the same time.
+class StageRunnerConfig:
+    root_dir: Path
+    max_parallel_stages: int
+
+@dataclass(frozen=True)
+# The `ImportBenchmarkConfig` class holds the module whose import time is tracked, its time budget and
+# the heavy modules it must not import.
+class ImportBenchmarkConfig:
+    root_dir: Path
+    report_file: Path
+    module: str
+    repeats: int
+    max_seconds: float
+    forbidden_modules: list
+    top_modules: int
+
+@dataclass(frozen=True)
+# The `LoadBenchmarkConfig` class holds where the model loading benchmark writes its report and how
+# many worker processes load the served model at the same time.
+class LoadBenchmarkConfig:
+    root_dir: Path
+    report_file: Path
+    num_workers: int
+
+@dataclass(frozen=True)
+# The `StageProfilerConfig` class holds where the pipeline writes its run reports, which hot-function
+# profiler runs around each stage and when a stage counts as slower than its previous run.
+class StageProfilerConfig:
+    root_dir: Path
+    enabled: bool
+    hotspots: str
+    top_functions: int
+    py_spy_rate: int
+    regression_threshold: float
+
+@dataclass(frozen=True)
+# The `InferenceBenchmarkConfig` class holds the size of the randomly initialized fixture model the
+# offline inference benchmark builds, and the latency, generation, evaluation and load test settings
+# it measures it with.
+class InferenceBenchmarkConfig:
+    root_dir: Path
+    fixture_dir: Path
+    report_file: Path
+    seed: int
+    vocab_size: int
+    d_model: int
+    num_layers: int
+    num_heads: int
+    ffn_dim: int
+    num_dialogues: int
+    dialogue_words: int
+    latency_samples: int
+    num_beams: list
+    max_lengths: list
+    batch_size: int
+    concurrency_levels: list
+    requests_per_level: int
+    startup_timeout_seconds: int
@@ -1,6 +1,8 @@
 import os
 import sys
+import json
 import logging
+from contextvars import ContextVar
 
 # setting up the logging configuration
 logging_str = "[%(asctime)s: %(levelname)s: %(module)s: %(message)s]"
@@ -24,4 +26,33 @@ logging.basicConfig(
 
 # The line `logger = logging.getLogger("textSummarizerLogger")` is creating a logger object named
 # "textSummarizerLogger".
-logger = logging.getLogger("textSummarizerLogger")
\ No newline at end of file
+logger = logging.getLogger("textSummarizerLogger")
+
+
+# The trace ID of the request being served. The serving app sets it for every request, and asyncio
+# tasks started while handling the request inherit it.
+trace_id = ContextVar("trace_id", default=None)
+
+
+# The `JsonFormatter` class writes each record as one JSON object per line. The fields passed with
+# `extra={"fields": {...}}` are added to the object, and so is the current trace ID.
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "event": record.getMessage(),
+            "trace_id": trace_id.get(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, default=str)
+
+
+# The line `request_logger = logging.getLogger("textSummarizerRequestLogger")` creates the structured
+# request logger, which writes JSON lines to its own file instead of the running log.
+request_log_filepath = os.path.join(log_dir, "requests.jsonl")
+request_handler = logging.FileHandler(request_log_filepath)
+request_handler.setFormatter(JsonFormatter())
+request_logger = logging.getLogger("textSummarizerRequestLogger")
+request_logger.addHandler(request_handler)
+request_logger.propagate = False
@@ -1,31 +1,244 @@
+import threading
+import time
+from contextlib import nullcontext
 from textSummarizer.config.configuration import ConfigurationManager
-from transformers import AutoTokenizer
-from transformers import pipeline
+from textSummarizer.components.model_registry import ModelHandle, model_registry
+from textSummarizer.components.adapters import UnknownAdapterError
+from textSummarizer.entity import PredictionConfig
+from textSummarizer.logging import logger
+
+# torch and transformers are imported inside the functions that run the model, so importing this
+# module (e.g. from the serving app) stays cheap until the first prediction.
+
+
+# The CancelledCriteria class stops generation as soon as its event is set, e.g. when a streaming
+# client disconnects. It has the call signature of a transformers `StoppingCriteria` without
+# subclassing it, so defining it does not import transformers.
+class CancelledCriteria:
+    def __init__(self, cancel_event: threading.Event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.cancel_event.is_set()
 
 
 class PredictionPipeline:
-    def __init__(self):
-        self.config = ConfigurationManager().get_model_evaluation_config()
-    
+    def __init__(self, handle: ModelHandle = None, config: PredictionConfig = None):
+        """
+        :param handle: An already-loaded `ModelHandle`. When omitted the handle is fetched from the
+        process-wide model registry, which loads the model only once per process
+        :param config: The prediction configuration. When omitted it is read from the YAML files
+        """
+        self.config = config if config is not None else ConfigurationManager().get_prediction_config()
+        self.handle = handle if handle is not None else model_registry.get_for_config(self.config)
+
     def predict(self,text):
         """
         The `predict` function takes in a text as input, tokenizes it, and uses a pre-trained model to
         generate a summary of the text. The generated summary is then returned as output.
-        
+
         :param text: The `text` parameter is the input dialogue that you want to summarize. It can be a
         string containing the conversation or dialogue that you want to summarize
         :return: the generated summary text.
         """
-        tokenizer = AutoTokenizer.from_pretrained(self.config.tokenizer_path)
-        gen_kwargs = {"length_penalty": 0.8, "num_beams":8, "max_length": 128}
+        output = self.predict_batch([text])[0]
+        logger.info(f"Summarized a dialogue of {len(text)} characters into {len(output)} characters")
+
+        return output
+
+    def predict_batch(self, texts, gen_kwargs = None, report = None):
+        """
+        The `predict_batch` function summarizes several texts with a single `model.generate` call. The
+        texts are padded to the longest one in the batch rather than to the maximum input length.
+
+        :param texts: The list of input dialogues to summarize
+        :param gen_kwargs: Generation parameters that override the configured `GenerationArguments`
+        for this batch. An `adapter` entry selects the LoRA adapter to apply (optional)
+        :param report: A dictionary that receives the measurements of the batch: the seconds spent in
+        each phase (`tokenize_seconds`, `encode_seconds`, `decode_seconds`, `detokenize_seconds`), the
+        input and output token counts, the encoder-output cache hits and misses and the model load
+        time (optional)
+        :return: the generated summaries, in the same order as `texts`.
+        """
+        import torch
+
+        report = report if report is not None else {}
+        gen_kwargs = {**self.config.gen_kwargs, **(gen_kwargs or {})}
+        adapter = gen_kwargs.pop("adapter", None)
+        tokenizer = self.handle.tokenizer
+
+        start = time.perf_counter()
+        inputs = tokenizer(list(texts), max_length=self.config.max_input_length, truncation=True,
+                           padding="longest", return_tensors="pt").to(self.handle.device)
+        report["tokenize_seconds"] = time.perf_counter() - start
+
+        with self.activate(adapter) as model, torch.inference_mode():
+            start = time.perf_counter()
+            encoder_kwargs = self.encode(model, inputs["input_ids"], inputs["attention_mask"], adapter, report)
+            if encoder_kwargs:
+                report["encode_seconds"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            summaries = model.generate(input_ids=inputs["input_ids"],
+                                       attention_mask=inputs["attention_mask"],
+                                       **encoder_kwargs,
+                                       **gen_kwargs)
+            report["decode_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        outputs = tokenizer.batch_decode(summaries, skip_special_tokens=True,
+                                         clean_up_tokenization_spaces=True)
+        report["detokenize_seconds"] = time.perf_counter() - start
+
+        report["input_tokens"] = int(inputs["attention_mask"].sum())
+        # The first position of every row is the decoder start token, not a generated one.
+        report["output_tokens"] = int((summaries[:, 1:] != tokenizer.pad_token_id).sum())
+        report["model_load_seconds"] = self.handle.load_seconds
+        return outputs
+
+    def activate(self, adapter = None):
+        """
+        The `activate` function selects the LoRA adapter a generation runs with.
+
+        :param adapter: The name of the adapter, None for the base model (optional)
+        :return: a context manager yielding the model to generate with.
+        """
+        if self.handle.adapters is not None:
+            return self.handle.adapters.activate(adapter)
+        if adapter is not None:
+            raise UnknownAdapterError(adapter)
+        return nullcontext(self.handle.model)
+
+    def encode(self, model, input_ids, attention_mask, adapter = None, report = None):
+        """
+        The `encode` function runs the encoder separately from `generate`, so that `generate` only
+        runs the decoder. With an encoder-output cache on the handle, the encoder only runs for the
+        rows of a batch whose states are not cached yet; every row is cached under its own unpadded
+        token IDs, so a dialogue is reused whatever it was batched with.
+
+        :param model: The model returned by `activate`
+        :param input_ids: The padded (batch, sequence) token IDs
+        :param attention_mask: The matching attention mask
+        :param adapter: The active LoRA adapter, which the cached states depend on (optional)
+        :param report: A dictionary that receives the cache hit and miss counts of the batch (optional)
+        :return: a dictionary with an `encoder_outputs` entry to pass to `generate`, or an empty
+        dictionary when the model does not expose its encoder, like ONNX graphs.
+        """
+        import torch
+        from transformers.modeling_outputs import BaseModelOutput
+
+        if not isinstance(model, torch.nn.Module):
+            return {}
+
+        cache = self.handle.encoder_cache
+        if cache is None:
+            with torch.inference_mode():
+                return {"encoder_outputs": model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask)}
+
+        mask = attention_mask.bool()
+        keys = [cache.make_key(input_ids[i][mask[i]], adapter) for i in range(input_ids.shape[0])]
+        rows = [cache.get(key) for key in keys]
+
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if report is not None:
+            report["encoder_cache_hits"] = len(rows) - len(missing)
+            report["encoder_cache_misses"] = len(missing)
+        if missing:
+            with torch.inference_mode():
+                hidden = model.get_encoder()(input_ids=input_ids[missing],
+                                                         attention_mask=attention_mask[missing]).last_hidden_state
+            for j, i in enumerate(missing):
+                rows[i] = hidden[j][mask[i]].clone()
+                cache.put(keys[i], rows[i])
+
+        # Padding positions are masked out of cross-attention, so zeros are as good as real states.
+        last_hidden_state = rows[0].new_zeros(input_ids.shape + rows[0].shape[-1:])
+        for i, row in enumerate(rows):
+            last_hidden_state[i][mask[i]] = row
+
+        return {"encoder_outputs": BaseModelOutput(last_hidden_state=last_hidden_state)}
+
+    def predict_stream(self, text, gen_kwargs = None, cancel_event: threading.Event = None):
+        """
+        The `predict_stream` function summarizes a text with greedy or sampling decode and yields the
+        summary piece by piece while it is being generated. Generation runs on a background thread and
+        stops early once `cancel_event` is set or the returned generator is closed.
+
+        :param text: The input dialogue to summarize
+        :param gen_kwargs: Generation parameters overriding the configured defaults. Beam search is
+        always disabled because a token streamer follows a single hypothesis (optional)
+        :param cancel_event: An event the caller sets to abandon generation (optional)
+        :return: a generator of decoded text pieces.
+        """
+        import torch
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+        gen_kwargs = {**self.config.gen_kwargs, **(gen_kwargs or {})}
+        adapter = gen_kwargs.pop("adapter", None)
+        gen_kwargs["num_beams"] = 1
+        gen_kwargs.pop("length_penalty", None)
+
+        cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        tokenizer = self.handle.tokenizer
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        clean_up_tokenization_spaces=True)
+        inputs = tokenizer([text], max_length=self.config.max_input_length, truncation=True,
+                           return_tensors="pt").to(self.handle.device)
+        errors = []
+
+        def generate():
+            try:
+                with self.activate(adapter) as model, torch.inference_mode():
+                    model.generate(input_ids=inputs["input_ids"],
+                                   attention_mask=inputs["attention_mask"],
+                                   **self.encode(model, inputs["input_ids"], inputs["attention_mask"], adapter),
+                                   streamer=streamer,
+                                   stopping_criteria=StoppingCriteriaList([CancelledCriteria(cancel_event)]),
+                                   **gen_kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+            thread.join()
+            if errors:
+                raise errors[0]
+        finally:
+            cancel_event.set()
+
+
+def init_prediction_worker(config: PredictionConfig, num_threads: int = 0):
+    """
+    The function `init_prediction_worker` prepares an inference pool worker: it sets the worker's torch
+    thread budget and loads and warms up the model in the worker's own registry.
 
-        pipe = pipeline("summarization", model=self.config.model_path,tokenizer=tokenizer)
+    :param config: The prediction configuration of the model to load
+    :param num_threads: The number of intra-op threads torch may use in this worker, 0 keeps the torch
+    default (optional)
+    """
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    model_registry.warmup(config)
 
-        print("Dialogue:")
-        print(text)
 
-        output = pipe(text, **gen_kwargs)[0]["summary_text"]
-        print("\nModel Summary:")
-        print(output)
+def predict_batch_in_worker(config: PredictionConfig, texts, gen_kwargs = None):
+    """
+    The function `predict_batch_in_worker` is the picklable entry point inference pool workers use to
+    summarize a batch with the model held by their registry.
 
-        return output
\ No newline at end of file
+    :param config: The prediction configuration of the model to use
+    :param texts: The list of input dialogues to summarize
+    :param gen_kwargs: Generation parameters overriding the configured defaults (optional)
+    :return: the generated summaries, in the same order as `texts`, and the measurements of the batch
+    (see `PredictionPipeline.predict_batch`), which the worker sends back to the serving process.
+    """
+    report = {}
+    summaries = PredictionPipeline(config=config).predict_batch(texts, gen_kwargs, report)
+    return summaries, report
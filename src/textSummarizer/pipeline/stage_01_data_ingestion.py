@@ -6,6 +6,12 @@ from textSummarizer.logging import logger
 
 # The DataIngestionTrainingPipeline class is used for data ingestion and training pipeline operations.
 class DataIngestionTrainingPipeline:
+    STAGE_NAME = "Data Ingestion stage"
+    INPUTS = []
+    OUTPUTS = ["{data_ingestion.unzip_dir}/samsum_dataset"]
+    CONFIG_SECTIONS = ["data_ingestion"]
+    PARAMS_SECTIONS = []
+
     def __init__(self):
         pass
 
@@ -5,6 +5,12 @@ from textSummarizer.logging import logger
 
 # The DataValidationTrainingPipeline class is used for data validation in a training pipeline.
 class DataValidationTrainingPipeline:
+    STAGE_NAME = "Data Validation stage"
+    INPUTS = ["{data_ingestion.unzip_dir}/samsum_dataset"]
+    OUTPUTS = ["{data_validation.STATUS_FILE}"]
+    CONFIG_SECTIONS = ["data_validation"]
+    PARAMS_SECTIONS = []
+
     def __init__(self):
         pass
 
@@ -5,6 +5,12 @@ from textSummarizer.logging import logger
 
 # The DataTransformationTrainingPipeline class is used for data transformation in a training pipeline.
 class DataTransformationTrainingPipeline:
+    STAGE_NAME = "Data Transformation stage"
+    INPUTS = ["{data_transformation.data_path}", "{data_validation.STATUS_FILE}"]
+    OUTPUTS = ["{data_transformation.root_dir}/samsum_dataset"]
+    CONFIG_SECTIONS = ["data_transformation"]
+    PARAMS_SECTIONS = ["DataTransformation"]
+
     def __init__(self):
         pass
 
@@ -6,6 +6,16 @@ from textSummarizer.logging import logger
 
 # The ModelTrainerTrainingPipeline class is used for training machine learning models.
 class ModelTrainerTrainingPipeline:
+    STAGE_NAME = "Model Training stage"
+    INPUTS = ["{model_trainer.data_path}"]
+    OUTPUTS = [
+        "{model_trainer.root_dir}/pegasus-samsum-model",
+        "{model_trainer.root_dir}/tokenizer",
+        "{model_trainer.adapter_dir}",
+    ]
+    CONFIG_SECTIONS = ["model_trainer"]
+    PARAMS_SECTIONS = ["TrainingArguments", "LoRA"]
+
     def __init__(self):
         pass
 
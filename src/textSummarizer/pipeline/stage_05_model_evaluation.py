@@ -3,6 +3,16 @@ from textSummarizer.components.model_evaluation import ModelEvaluation
 from textSummarizer.logging import logger
 
 class ModelEvaluationTrainingPipeline:
+    STAGE_NAME = "Model Evaluation stage"
+    INPUTS = [
+        "{model_evaluation.data_path}",
+        "{model_evaluation.model_path}",
+        "{model_evaluation.tokenizer_path}",
+    ]
+    OUTPUTS = ["{model_evaluation.metric_file_name}"]
+    CONFIG_SECTIONS = ["model_evaluation"]
+    PARAMS_SECTIONS = ["Evaluation"]
+
     def __init__(self):
         pass
 
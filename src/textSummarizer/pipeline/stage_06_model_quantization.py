@@ -0,0 +1,34 @@
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.model_quantization import ModelQuantization
+from textSummarizer.logging import logger
+
+
+# The ModelQuantizationTrainingPipeline class is used for quantizing the trained model for CPU serving.
+class ModelQuantizationTrainingPipeline:
+    STAGE_NAME = "Model Quantization stage"
+    INPUTS = [
+        "{model_quantization.data_path}",
+        "{model_quantization.model_path}",
+        "{model_quantization.tokenizer_path}",
+    ]
+    OUTPUTS = [
+        "{model_quantization.quantized_model_path}",
+        "{model_quantization.report_file}",
+    ]
+    CONFIG_SECTIONS = ["model_quantization", "model_evaluation"]
+    PARAMS_SECTIONS = ["Quantization", "Evaluation"]
+
+    def __init__(self):
+        pass
+
+    def main(self):
+        """
+        The main function quantizes the trained model and publishes the quantized copy if it passes
+        the ROUGE tolerance gate.
+        """
+        config = ConfigurationManager()
+        model_quantization_config = config.get_model_quantization_config()
+        model_evaluation_config = config.get_model_evaluation_config()
+        model_quantization = ModelQuantization(config=model_quantization_config,
+                                               evaluation_config=model_evaluation_config)
+        model_quantization.quantize()
\ No newline at end of file
@@ -0,0 +1,29 @@
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.model_export import ModelExport
+from textSummarizer.logging import logger
+
+
+# The ModelExportTrainingPipeline class is used for exporting the trained model to ONNX for serving.
+class ModelExportTrainingPipeline:
+    STAGE_NAME = "Model Export stage"
+    INPUTS = [
+        "{model_export.data_path}",
+        "{model_export.model_path}",
+        "{model_export.tokenizer_path}",
+    ]
+    OUTPUTS = ["{model_export.parity_file}"]
+    CONFIG_SECTIONS = ["model_export"]
+    PARAMS_SECTIONS = ["ModelExport", "GenerationArguments"]
+
+    def __init__(self):
+        pass
+
+    def main(self):
+        """
+        The main function exports the trained model to ONNX and keeps the export only if its summaries
+        match the PyTorch model.
+        """
+        config = ConfigurationManager()
+        model_export_config = config.get_model_export_config()
+        model_export = ModelExport(config=model_export_config)
+        model_export.export()
\ No newline at end of file
@@ -0,0 +1,36 @@
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.model_distillation import ModelDistillation
+from textSummarizer.logging import logger
+
+
+# The ModelDistillationTrainingPipeline class is used for distilling the trained model into a smaller
+# student and comparing the two.
+class ModelDistillationTrainingPipeline:
+    STAGE_NAME = "Model Distillation stage"
+    INPUTS = [
+        "{model_distillation.data_path}",
+        "{model_distillation.teacher_model_path}",
+        "{model_distillation.tokenizer_path}",
+    ]
+    OUTPUTS = [
+        "{model_distillation.student_model_path}",
+        "{model_distillation.report_file}",
+    ]
+    CONFIG_SECTIONS = ["model_distillation", "model_evaluation"]
+    PARAMS_SECTIONS = ["Distillation", "Evaluation", "GenerationArguments"]
+
+    def __init__(self):
+        pass
+
+    def main(self):
+        """
+        The main function distills the trained model into the student and writes the teacher/student
+        latency-vs-ROUGE report.
+        """
+        config = ConfigurationManager()
+        model_distillation_config = config.get_model_distillation_config()
+        model_evaluation_config = config.get_model_evaluation_config()
+        model_distillation = ModelDistillation(config=model_distillation_config,
+                                               evaluation_config=model_evaluation_config)
+        model_distillation.distill()
+        model_distillation.report()
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List
+from textSummarizer.config.configuration import ConfigurationManager
+from textSummarizer.components.stage_profiler import StageProfiler
+from textSummarizer.entity import StageRunnerConfig
+from textSummarizer.logging import logger
+from textSummarizer.utils.common import get_content_hash, get_directory_fingerprint
+
+
+TEMPLATE_KEY_RE = re.compile(r"\{([A-Za-z0-9_.]+)\}")
+
+
+def run_stage(stage, profiler: StageProfiler = None) -> dict:
+    """
+    The function `run_stage` runs one stage with the usual start and completion logging. It is the
+    picklable entry point of stage worker processes.
+
+    :param stage: The stage class, e.g. `ModelEvaluationTrainingPipeline`
+    :param profiler: The profiler measuring the stage in the process that runs it (optional)
+    :return: the stage measurements, empty without a profiler.
+    """
+    try:
+        logger.info(f">>>>>> stage {stage.STAGE_NAME} started <<<<<<")
+        if profiler is None:
+            stage().main()
+            measurements = {}
+        else:
+            with profiler.profile(stage.__name__) as measurements:
+                stage().main()
+            logger.info(f"Stage {stage.STAGE_NAME} took {measurements['wall_seconds']:.1f}s "
+                        f"({measurements['cpu_seconds']:.1f}s CPU, peak RSS {measurements['peak_rss_mb']:.0f} MB)")
+        logger.info(f">>>>>> stage {stage.STAGE_NAME} completed <<<<<<\n\nx==========x")
+        return measurements
+    except Exception as e:
+        logger.exception(e)
+        raise e
+
+
+# The StageRunner class runs the pipeline stages as a DAG. Every stage class declares the paths it
+# reads (`INPUTS`) and writes (`OUTPUTS`) as templates over config.yaml keys, e.g.
+# "{model_trainer.root_dir}/tokenizer", plus the config.yaml sections (`CONFIG_SECTIONS`) and
+# params.yaml sections (`PARAMS_SECTIONS`) it depends on. A stage depends on every stage whose outputs
+# overlap its inputs. It is skipped when its outputs exist and the content hash of its inputs and
+# configuration matches the one recorded after its last successful run, and stages whose
+# dependencies are done run concurrently.
+class StageRunner:
+    def __init__(self, stages: List[type], config: StageRunnerConfig, config_manager: ConfigurationManager,
+                 profiler: StageProfiler = None):
+        """
+        :param stages: The stage classes, in a valid sequential order
+        :param config: The runner configuration
+        :param config_manager: The configuration manager the stage declarations are resolved against
+        :param profiler: The profiler measuring every stage that runs and writing the run report
+        (optional)
+        """
+        self.stages = stages
+        self.config = config
+        self.config_manager = config_manager
+        self.profiler = profiler
+        self._content_hashes = {}
+
+
+    def resolve(self, template: str) -> str:
+        """
+        The function `resolve` fills a path template with config.yaml values.
+
+        :param template: A path such as "{model_trainer.root_dir}/tokenizer"
+        :return: the normalized path.
+        """
+        def lookup(match):
+            value = self.config_manager.config
+            for key in match.group(1).split("."):
+                value = value[key]
+            return str(value)
+
+        return os.path.normpath(TEMPLATE_KEY_RE.sub(lookup, template))
+
+
+    def dependencies(self) -> Dict[type, List[type]]:
+        """
+        The function `dependencies` derives the DAG from the stage declarations. A stage depends on an
+        earlier stage when one of its inputs is, contains or lies inside one of that stage's outputs.
+        :return: a dictionary mapping every stage to the stages it depends on.
+        """
+        def overlaps(a, b):
+            return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+        graph = {}
+        for position, stage in enumerate(self.stages):
+            inputs = [self.resolve(t) for t in stage.INPUTS]
+            graph[stage] = [upstream for upstream in self.stages[:position]
+                            if any(overlaps(i, self.resolve(o)) for i in inputs for o in upstream.OUTPUTS)]
+        return graph
+
+
+    def content_hash(self, path: str) -> str:
+        """
+        The function `content_hash` hashes the contents of an input path. Results are reused until the
+        path, size or modification time of one of its files changes, so an input shared by several
+        stages is only read once.
+
+        :param path: The file or directory to hash
+        :return: a hex sha256 digest.
+        """
+        fingerprint = get_directory_fingerprint(path) if os.path.exists(path) else "missing"
+        cached = self._content_hashes.get(path)
+        if cached is None or cached[0] != fingerprint:
+            cached = (fingerprint, get_content_hash(path))
+            self._content_hashes[path] = cached
+        return cached[1]
+
+
+    def stage_hash(self, stage) -> str:
+        """
+        The function `stage_hash` hashes everything a stage's result depends on: the contents of its
+        inputs and its config.yaml and params.yaml sections.
+
+        :param stage: The stage class
+        :return: a hex sha256 digest.
+        """
+        config = self.config_manager.config
+        params = self.config_manager.params
+        payload = json.dumps({
+            "inputs": {t: self.content_hash(self.resolve(t)) for t in stage.INPUTS},
+            "config": {name: config[name].to_dict() for name in stage.CONFIG_SECTIONS},
+            "params": {name: params[name].to_dict() for name in stage.PARAMS_SECTIONS},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+    def record_file(self, stage) -> str:
+        """
+        The function `record_file` returns the path of a stage's completion record.
+
+        :param stage: The stage class
+        :return: the path of the JSON record under `root_dir`.
+        """
+        return os.path.join(self.config.root_dir, f"{stage.__name__}.json")
+
+
+    def is_up_to_date(self, stage, digest: str) -> bool:
+        """
+        The function `is_up_to_date` tells whether a stage can be skipped.
+
+        :param stage: The stage class
+        :param digest: The current hash returned by `stage_hash`
+        :return: True if all outputs exist and the last successful run had the same hash.
+        """
+        if not all(os.path.exists(self.resolve(t)) for t in stage.OUTPUTS):
+            return False
+        if not os.path.exists(self.record_file(stage)):
+            return False
+        with open(self.record_file(stage)) as f:
+            return json.load(f).get("hash") == digest
+
+
+    def record(self, stage, digest: str):
+        """
+        The function `record` marks a stage as completed for the given hash.
+
+        :param stage: The stage class
+        :param digest: The hash the stage ran with
+        """
+        with open(self.record_file(stage), 'w') as f:
+            json.dump({"stage": stage.STAGE_NAME, "hash": digest, "completed_at": time.time()}, f)
+
+
+    def run(self, force: bool = False):
+        """
+        The function `run` runs every stage that is out of date once its dependencies are done, up to
+        `max_parallel_stages` at a time. Stages run in spawned processes when more than one may run at
+        once, and in this process otherwise. The first failure stops scheduling and is re-raised once
+        the running stages have finished. With a profiler, the run report is written even when a stage
+        fails.
+
+        :param force: Run every stage even if it is up to date, defaults to False (optional)
+        """
+        graph = self.dependencies()
+        pending = list(self.stages)
+        done = set()
+        running = {}
+        failure = None
+        started = time.time()
+        entries = {}
+
+        def report(stage, digest, status, measurements=None, error=None):
+            entries[stage] = {"stage": stage.__name__, "name": stage.STAGE_NAME, "status": status,
+                              "hash": digest, **(measurements or {})}
+            if error is not None:
+                entries[stage]["error"] = repr(error)
+
+        executor = None
+        if self.config.max_parallel_stages > 1:
+            # Spawned workers do not inherit the parent's torch thread pools or CUDA state.
+            executor = ProcessPoolExecutor(max_workers=self.config.max_parallel_stages,
+                                           mp_context=multiprocessing.get_context("spawn"))
+
+        try:
+            while pending or running:
+                ready = [s for s in pending if all(d in done for d in graph[s])] if failure is None else []
+                for stage in ready:
+                    pending.remove(stage)
+                    digest = self.stage_hash(stage)
+                    if not force and self.is_up_to_date(stage, digest):
+                        logger.info(f">>>>>> stage {stage.STAGE_NAME} is up to date, skipped <<<<<<")
+                        report(stage, digest, "skipped")
+                        done.add(stage)
+                        continue
+                    if executor is None:
+                        try:
+                            measurements = run_stage(stage, self.profiler)
+                        except Exception as e:
+                            report(stage, digest, "failed", error=e)
+                            raise
+                        report(stage, digest, "completed", measurements)
+                        self.record(stage, digest)
+                        done.add(stage)
+                        break
+                    running[executor.submit(run_stage, stage, self.profiler)] = (stage, digest)
+
+                if not running:
+                    if failure is not None or not pending:
+                        break
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, digest = running.pop(future)
+                    if future.exception() is not None:
+                        failure = failure or future.exception()
+                        report(stage, digest, "failed", error=future.exception())
+                        continue
+                    report(stage, digest, "completed", future.result())
+                    self.record(stage, digest)
+                    done.add(stage)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if self.profiler is not None:
+                self.profiler.write_report([entries[s] for s in self.stages if s in entries], started, force)
+
+        if failure is not None:
+            raise failure
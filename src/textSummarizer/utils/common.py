@@ -1,3 +1,4 @@
+import hashlib
 import os
 from box.exceptions import BoxValueError
 import yaml
@@ -78,4 +79,79 @@ def get_size(path: Path) -> str:
         str: size in KB
     """
     size_in_kb = round(os.path.getsize(path)/1024)
-    return f"~ {size_in_kb} KB"
\ No newline at end of file
+    return f"~ {size_in_kb} KB"
+
+def get_directory_fingerprint(*paths) -> str:
+    """
+    The function `get_directory_fingerprint` fingerprints files from the path, size and modification
+    time of every file under the given paths, without reading their contents.
+
+    :param paths: The files or directories to fingerprint
+    :return: a hex sha256 digest that changes whenever a file is added, removed or rewritten.
+    """
+    digest = hashlib.sha256()
+    for base in paths:
+        base = str(base)
+        targets = [(os.path.dirname(base), [], [os.path.basename(base)])] if os.path.isfile(base) else os.walk(base)
+        for root, dirs, files in targets:
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                digest.update(f"{os.path.relpath(path, base)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def get_content_hash(path) -> str:
+    """
+    The function `get_content_hash` hashes the contents of a file, or of every file under a directory
+    together with their relative paths.
+
+    :param path: The file or directory to hash
+    :return: a hex sha256 digest, or "missing" if the path does not exist.
+    """
+    path = str(path)
+    if not os.path.exists(path):
+        return "missing"
+
+    digest = hashlib.sha256()
+    targets = [(os.path.dirname(path), [], [os.path.basename(path)])] if os.path.isfile(path) else os.walk(path)
+    for root, dirs, files in targets:
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(f"{os.path.relpath(file_path, path)}\n".encode())
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def length_grouped_batches(lengths: list, max_batch_size: int = None, max_tokens: int = None) -> list:
+    """
+    The function `length_grouped_batches` sorts examples by length and groups neighbours into batches,
+    so every batch contains examples of similar length and needs little padding.
+
+    :param lengths: The token length of every example
+    :param max_batch_size: The maximum number of examples in a batch (optional)
+    :param max_tokens: The maximum number of padded tokens in a batch, i.e. the batch size times the
+    length of its longest example (optional)
+    :return: a list of batches, each a list of indices into `lengths`. Batches are ordered from the
+    longest examples to the shortest, so memory problems surface on the first batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+
+    batches = []
+    batch = []
+    for index in order:
+        # Examples arrive longest first, so the first member sets the padded length of the batch.
+        padded_length = lengths[batch[0]] if batch else lengths[index]
+        too_many = max_batch_size is not None and len(batch) + 1 > max_batch_size
+        too_long = max_tokens is not None and (len(batch) + 1) * padded_length > max_tokens
+        if batch and (too_many or too_long):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
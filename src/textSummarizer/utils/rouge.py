@@ -0,0 +1,247 @@
+import multiprocessing
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL", "rougeLsum")
+
+# Same normalization as the reference ROUGE-1.5.5 tokenizer (and `rouge_score` without stemming).
+NON_ALPHANUM_RE = re.compile(r"[^a-z0-9]+")
+
+# Below this many examples a process pool costs more than it saves.
+MIN_EXAMPLES_PER_PROCESS = 2048
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    The function `tokenize` lowercases a text and splits it into alphanumeric tokens.
+
+    :param text: The text to tokenize
+    :return: the list of tokens.
+    """
+    return NON_ALPHANUM_RE.sub(" ", text.lower()).split()
+
+
+def fmeasure(precision: float, recall: float) -> float:
+    """
+    The function `fmeasure` computes the harmonic mean of precision and recall.
+
+    :param precision: The precision
+    :param recall: The recall
+    :return: the F-measure, 0 when both are 0.
+    """
+    if precision + recall > 0:
+        return 2 * precision * recall / (precision + recall)
+    return 0.0
+
+
+def ngram_counts(tokens: List[str], n: int) -> Counter:
+    """
+    The function `ngram_counts` counts the n-grams of a token list.
+
+    :param tokens: The tokens
+    :param n: The n-gram order, e.g. 2 for bigrams
+    :return: a Counter mapping every n-gram tuple to its number of occurrences.
+    """
+    return Counter(zip(*(tokens[i:] for i in range(n))))
+
+
+def score_ngrams(reference: List[str], prediction: List[str], n: int) -> Tuple[float, float, float]:
+    """
+    The function `score_ngrams` computes ROUGE-N between two token lists.
+
+    :param reference: The reference tokens
+    :param prediction: The predicted tokens
+    :param n: The n-gram order
+    :return: a (precision, recall, fmeasure) tuple.
+    """
+    reference_ngrams = ngram_counts(reference, n)
+    prediction_ngrams = ngram_counts(prediction, n)
+    overlap = sum((reference_ngrams & prediction_ngrams).values())
+
+    precision = overlap / max(sum(prediction_ngrams.values()), 1)
+    recall = overlap / max(sum(reference_ngrams.values()), 1)
+    return precision, recall, fmeasure(precision, recall)
+
+
+def lcs_length(a: List[str], b: List[str]) -> int:
+    """
+    The function `lcs_length` computes the length of the longest common subsequence of two token lists
+    with the bit-parallel algorithm of Hyyrö (2004). Every column of the dynamic programming table is
+    one integer, so the cost is O(len(b)) big-integer operations instead of O(len(a) * len(b)) Python
+    steps.
+
+    :param a: The first token list
+    :param b: The second token list
+    :return: the LCS length.
+    """
+    if not a or not b:
+        return 0
+
+    matches = {}
+    for i, token in enumerate(a):
+        matches[token] = matches.get(token, 0) | (1 << i)
+
+    mask = (1 << len(a)) - 1
+    row = mask
+    for token in b:
+        match = row & matches.get(token, 0)
+        row = ((row + match) | (row - match)) & mask
+
+    return len(a) - bin(row).count("1")
+
+
+def lcs_indices(reference: List[str], prediction: List[str]) -> List[int]:
+    """
+    The function `lcs_indices` reads out one longest common subsequence as positions in `reference`.
+    Ties are broken exactly like ROUGE-1.5.5, which the union LCS of ROUGE-Lsum depends on.
+
+    :param reference: The reference tokens
+    :param prediction: The predicted tokens
+    :return: the sorted positions in `reference` of the LCS tokens.
+    """
+    rows = len(reference)
+    cols = len(prediction)
+    table = [[0] * (cols + 1)]
+    for i in range(rows):
+        previous = table[-1]
+        current = [0] * (cols + 1)
+        token = reference[i]
+        for j in range(cols):
+            if token == prediction[j]:
+                current[j + 1] = previous[j] + 1
+            else:
+                current[j + 1] = previous[j + 1] if previous[j + 1] > current[j] else current[j]
+        table.append(current)
+
+    indices = []
+    i, j = rows, cols
+    while i > 0 and j > 0:
+        if reference[i - 1] == prediction[j - 1]:
+            indices.append(i - 1)
+            i -= 1
+            j -= 1
+        elif table[i][j - 1] > table[i - 1][j]:
+            j -= 1
+        else:
+            i -= 1
+
+    return indices[::-1]
+
+
+def score_lcs(reference: List[str], prediction: List[str]) -> Tuple[float, float, float]:
+    """
+    The function `score_lcs` computes ROUGE-L between two token lists.
+
+    :param reference: The reference tokens
+    :param prediction: The predicted tokens
+    :return: a (precision, recall, fmeasure) tuple.
+    """
+    if not reference or not prediction:
+        return 0.0, 0.0, 0.0
+
+    length = lcs_length(reference, prediction)
+    precision = length / len(prediction)
+    recall = length / len(reference)
+    return precision, recall, fmeasure(precision, recall)
+
+
+def score_summary_lcs(reference: str, prediction: str) -> Tuple[float, float, float]:
+    """
+    The function `score_summary_lcs` computes the summary-level ROUGE-Lsum, where sentences are
+    separated by newlines and every reference sentence is matched against the union of its LCS with
+    each predicted sentence.
+
+    :param reference: The reference summary
+    :param prediction: The predicted summary
+    :return: a (precision, recall, fmeasure) tuple.
+    """
+    reference_sents = [tokenize(s) for s in reference.split("\n") if len(s)]
+    prediction_sents = [tokenize(s) for s in prediction.split("\n") if len(s)]
+
+    m = sum(map(len, reference_sents))
+    n = sum(map(len, prediction_sents))
+    if not m or not n:
+        return 0.0, 0.0, 0.0
+
+    # With one sentence on each side the union LCS is a plain LCS.
+    if len(reference_sents) == 1 and len(prediction_sents) == 1:
+        return score_lcs(reference_sents[0], prediction_sents[0])
+
+    reference_counts = Counter(token for s in reference_sents for token in s)
+    prediction_counts = Counter(token for s in prediction_sents for token in s)
+
+    hits = 0
+    for sentence in reference_sents:
+        union = set()
+        for candidate in prediction_sents:
+            union.update(lcs_indices(sentence, candidate))
+        # Each token is only counted as often as it occurs in both summaries.
+        for token in (sentence[i] for i in sorted(union)):
+            if reference_counts[token] > 0 and prediction_counts[token] > 0:
+                hits += 1
+                reference_counts[token] -= 1
+                prediction_counts[token] -= 1
+
+    precision = hits / n
+    recall = hits / m
+    return precision, recall, fmeasure(precision, recall)
+
+
+def score_example(pair: Tuple[str, str]) -> Dict[str, Tuple[float, float, float]]:
+    """
+    The function `score_example` computes every ROUGE variant for one example.
+
+    :param pair: A (reference, prediction) tuple of texts
+    :return: a dictionary mapping each ROUGE variant to a (precision, recall, fmeasure) tuple.
+    """
+    reference, prediction = pair
+    reference_tokens = tokenize(reference)
+    prediction_tokens = tokenize(prediction)
+
+    return {
+        "rouge1": score_ngrams(reference_tokens, prediction_tokens, 1),
+        "rouge2": score_ngrams(reference_tokens, prediction_tokens, 2),
+        "rougeL": score_lcs(reference_tokens, prediction_tokens),
+        "rougeLsum": score_summary_lcs(reference, prediction),
+    }
+
+
+def rouge_scores(predictions: List[str], references: List[str], num_proc: int = 1) -> List[Dict[str, Tuple[float, float, float]]]:
+    """
+    The function `rouge_scores` computes every ROUGE variant for every example, spreading the examples
+    over `num_proc` processes when there are enough of them.
+
+    :param predictions: The generated summaries
+    :param references: The target summaries, in the same order as `predictions`
+    :param num_proc: The number of processes to use, defaults to 1 (optional)
+    :return: a list with one `score_example` result per example.
+    """
+    if len(predictions) != len(references):
+        raise ValueError("predictions and references must have the same length")
+
+    pairs = list(zip(references, predictions))
+    num_proc = min(num_proc, len(pairs) // MIN_EXAMPLES_PER_PROCESS)
+    if num_proc <= 1:
+        return [score_example(pair) for pair in pairs]
+
+    with multiprocessing.get_context("spawn").Pool(num_proc) as pool:
+        return pool.map(score_example, pairs, chunksize=max(1, len(pairs) // (4 * num_proc)))
+
+
+def compute_rouge(predictions: List[str], references: List[str], num_proc: int = 1) -> Dict[str, float]:
+    """
+    The function `compute_rouge` computes the corpus ROUGE scores as the mean F-measure over examples.
+
+    :param predictions: The generated summaries
+    :param references: The target summaries, in the same order as `predictions`
+    :param num_proc: The number of processes to use, defaults to 1 (optional)
+    :return: a dictionary mapping each ROUGE variant (rouge1, rouge2, rougeL, rougeLsum) to its mean
+    F-measure.
+    """
+    scores = rouge_scores(predictions, references, num_proc)
+    if not scores:
+        return {rn: 0.0 for rn in ROUGE_TYPES}
+    return {rn: sum(s[rn][2] for s in scores) / len(scores) for rn in ROUGE_TYPES}
+
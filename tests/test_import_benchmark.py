@@ -0,0 +1,33 @@
+import dataclasses
+import os
+import pytest
+from textSummarizer.components.import_benchmark import ImportBenchmark, parse_importtime
+from textSummarizer.config.configuration import ConfigurationManager
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:        85 |        205 | io
+import time:      1500 |       9800 | app
+Traceback line that is not part of the report
+"""
+
+
+def test_parse_importtime():
+    assert parse_importtime(IMPORTTIME_OUTPUT) == {"_io": (120, 120), "io": (85, 205), "app": (1500, 9800)}
+
+
+def test_app_import_stays_within_budget(tmp_path, monkeypatch):
+    # The app reads its config files relative to the working directory.
+    monkeypatch.chdir(ROOT)
+    pytest.importorskip("fastapi")
+    config = dataclasses.replace(ConfigurationManager().get_import_benchmark_config(),
+                                 report_file=str(tmp_path / "import_time.json"))
+
+    times = ImportBenchmark(config).measure()
+
+    assert sorted(name for name in config.forbidden_modules if name in times) == []
+    assert times[config.module][1] / 1e6 <= config.max_seconds
@@ -0,0 +1,60 @@
+import os
+import pytest
+from textSummarizer.entity import InferenceBenchmarkConfig, ModelExportConfig, PredictionConfig
+
+pytest.importorskip("optimum.onnxruntime")
+
+from textSummarizer.components.inference_benchmark import build_fixture
+from textSummarizer.components.model_export import ModelExport, is_onnx_model
+from textSummarizer.pipeline.prediction import PredictionPipeline
+
+
+GEN_KWARGS = {"length_penalty": 0.8, "num_beams": 4, "max_length": 32}
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """
+    Builds the inference benchmark's fixture model (the Pegasus architecture, randomly initialized
+    and small enough to export in seconds) and exports it to ONNX with the export stage.
+    """
+    root = tmp_path_factory.mktemp("export")
+    paths = build_fixture(InferenceBenchmarkConfig(
+        root_dir=root, fixture_dir=os.path.join(root, "fixture"), report_file=os.path.join(root, "report.json"),
+        seed=0, vocab_size=200, d_model=32, num_layers=2, num_heads=2, ffn_dim=64,
+        num_dialogues=8, dialogue_words=60, latency_samples=0, num_beams=[], max_lengths=[],
+        batch_size=4, concurrency_levels=[], requests_per_level=0, startup_timeout_seconds=0,
+    ))
+    config = ModelExportConfig(
+        root_dir=root, data_path=paths["dataset"], model_path=paths["model"], tokenizer_path=paths["tokenizer"],
+        onnx_model_path=os.path.join(root, "onnx"), parity_file=os.path.join(root, "parity.csv"),
+        parity_samples=8, min_exact_match=1.0, gen_kwargs=GEN_KWARGS,
+    )
+    return paths, config, ModelExport(config).export()
+
+
+def prediction_config(model_path, tokenizer_path) -> PredictionConfig:
+    return PredictionConfig(
+        model_path=model_path, tokenizer_path=tokenizer_path, device="cpu", torch_dtype="float32",
+        max_input_length=1024, warmup_on_startup=False, encoder_cache_bytes=0, adapter_dir="",
+        max_loaded_adapters=0, mmap_weights=False, gen_kwargs=GEN_KWARGS,
+    )
+
+
+def test_export_passes_the_parity_check(exported):
+    _, config, accepted = exported
+
+    assert accepted
+    assert is_onnx_model(config.onnx_model_path)
+
+
+def test_onnx_backend_matches_pytorch_backend(exported):
+    paths, config, _ = exported
+    from datasets import load_from_disk
+    dialogues = load_from_disk(paths["dataset"])["test"]["dialogue"]
+
+    pytorch = PredictionPipeline(config=prediction_config(paths["model"], paths["tokenizer"]))
+    onnx = PredictionPipeline(config=prediction_config(config.onnx_model_path, config.onnx_model_path))
+
+    assert not is_onnx_model(paths["model"])
+    assert onnx.predict_batch(dialogues) == pytorch.predict_batch(dialogues)
@@ -0,0 +1,45 @@
+import pytest
+from textSummarizer.utils.rouge import ROUGE_TYPES, compute_rouge, rouge_scores
+
+rouge_scorer = pytest.importorskip("rouge_score.rouge_scorer")
+
+
+# Fixed (prediction, reference) pairs covering SAMSum-style summaries, multi-sentence summaries for
+# ROUGE-Lsum, repeated tokens, punctuation, casing and empty texts.
+PAIRS = [
+    ("Amanda baked cookies and will bring Jerry some tomorrow.",
+     "Amanda baked cookies and will bring Jerry some tomorrow."),
+    ("Olivia and Olivier are voting for liberals in this election.",
+     "Olivia and Olivier are voting for liberals in this election. "),
+    ("Kim is in a bad mood. She is going to do yoga.",
+     "Kim may try the pomodoro technique recommended by Tim to get more stuff done."),
+    ("Edward thinks he is in love with Bella.\nRachel wants Edward to tell Bella.",
+     "Edward thinks he is in love with Bella. Rachel wants Edward to open up and tell Bella about his feelings."),
+    ("The meeting is at 5 pm.\nThe meeting is in room 12.\nBring the slides.",
+     "Sam will bring the slides.\nThe meeting in room 12 starts at 5 pm."),
+    ("the the the cat cat", "the cat sat on the mat with the other cat"),
+    ("Hannah needs Betty's number but Amanda doesn't have it!!!",
+     "HANNAH needs BETTY'S number, but amanda DOESN'T have it..."),
+    ("They will meet at 10:30 on 2020-03-14.", "They'll meet at 10.30 on 14/03/2020."),
+    ("", "Lenny can't decide which trousers to buy."),
+    ("Lenny bought the purple trousers.", ""),
+    ("", ""),
+]
+
+
+def test_rouge_scores_match_rouge_score():
+    predictions, references = zip(*PAIRS)
+    scorer = rouge_scorer.RougeScorer(list(ROUGE_TYPES))
+
+    for (prediction, reference), ours in zip(PAIRS, rouge_scores(list(predictions), list(references))):
+        theirs = scorer.score(reference, prediction)
+        for rn in ROUGE_TYPES:
+            assert tuple(ours[rn]) == pytest.approx(tuple(theirs[rn]), abs=1e-6), (rn, prediction, reference)
+
+
+def test_compute_rouge_is_the_mean_fmeasure():
+    predictions, references = zip(*PAIRS)
+    scorer = rouge_scorer.RougeScorer(list(ROUGE_TYPES))
+    expected = {rn: sum(scorer.score(r, p)[rn].fmeasure for p, r in PAIRS) / len(PAIRS) for rn in ROUGE_TYPES}
+
+    assert compute_rouge(list(predictions), list(references)) == pytest.approx(expected, abs=1e-6)